@@ -0,0 +1,114 @@
+"""Registry of logged-in sessions, for "who's online" lookups.
+
+``ActiveSession`` rows are written when a user logs in and deleted when
+they log out. ``ActiveSessionMiddleware`` refreshes ``last_seen`` and the
+expiry at most once per ``ACTIVE_SESSION_TOUCH_INTERVAL`` per session, and
+registers sessions that were logged in before the table existed. Expired
+sessions are filtered out by ``expire_date`` and deleted along with their
+``django_session`` rows by ``manage.py clearsessions``.
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, get_user_model
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ActiveSession
+
+# session key -> monotonic time of its last refresh, per process.
+_touched = {}
+_TOUCHED_LIMIT = 10000
+
+
+def online_users(now=None):
+    """Users with at least one unexpired session."""
+    now = now or timezone.now()
+    return get_user_model().objects.filter(active_sessions__expire_date__gt=now).distinct()
+
+
+@receiver(user_logged_in)
+def _register_session(sender, request, user, **kwargs):
+    session = getattr(request, 'session', None)
+    if session is None:
+        return
+    if session.session_key is None:
+        # login() flushed a session that belonged to another user; save
+        # the new one now so there is a key to register.
+        session.save()
+    now = timezone.now()
+    ActiveSession.objects.update_or_create(
+        session_id=session.session_key,
+        defaults={'user': user, 'logged_in_at': now, 'last_seen': now, 'expire_date': session.get_expiry_date()},
+    )
+    _touched[session.session_key] = time.monotonic()
+
+
+@receiver(user_logged_out)
+def _unregister_session(sender, request, user, **kwargs):
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        ActiveSession.objects.filter(session_id=session.session_key).delete()
+        _touched.pop(session.session_key, None)
+
+
+def _due(session_key):
+    interval = getattr(settings, 'ACTIVE_SESSION_TOUCH_INTERVAL', 60)
+    now = time.monotonic()
+    if now - _touched.get(session_key, float('-inf')) < interval:
+        return False
+    if len(_touched) >= _TOUCHED_LIMIT:
+        _touched.clear()
+    _touched[session_key] = now
+    return True
+
+
+class ActiveSessionMiddleware:
+    """Keep ``ActiveSession.last_seen`` current. Goes after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key and _due(session.session_key):
+            user_id = session.get(SESSION_KEY)
+            if user_id:
+                now = timezone.now()
+                expire_date = session.get_expiry_date()
+                updated = ActiveSession.objects.filter(session_id=session.session_key).update(
+                    last_seen=now, expire_date=expire_date,
+                )
+                if not updated:
+                    ActiveSession.objects.bulk_create([ActiveSession(
+                        session_id=session.session_key, user_id=user_id,
+                        logged_in_at=now, last_seen=now, expire_date=expire_date,
+                    )], ignore_conflicts=True)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key and _due(session.session_key):
+            user_id = await session.aget(SESSION_KEY)
+            if user_id:
+                now = timezone.now()
+                expire_date = await session.aget_expiry_date()
+                updated = await ActiveSession.objects.filter(session_id=session.session_key).aupdate(
+                    last_seen=now, expire_date=expire_date,
+                )
+                if not updated:
+                    await ActiveSession.objects.abulk_create([ActiveSession(
+                        session_id=session.session_key, user_id=user_id,
+                        logged_in_at=now, last_seen=now, expire_date=expire_date,
+                    )], ignore_conflicts=True)
+        return response
@@ -0,0 +1,116 @@
+"""The per-user activity feed behind the profile page's recent activities.
+
+Taps and inventory changes append ``Activity`` rows as they happen, so a
+user's feed is read newest first off the ``(user, timestamp)`` index with
+one query, and older entries are paged with a ``<microseconds>.<id>``
+cursor instead of an OFFSET. ``rebuild`` fills the feed from TimeLog and
+the inventory LogEntry history for ``manage.py rebuild_activity_feed``;
+the migration that adds the table does the same with its historical models.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.contrib.admin.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.utils import timezone
+
+from inventory.models import Item
+from rfid_login.models import TimeLog
+from .models import Activity
+
+_SUBJECT_LENGTH = Activity._meta.get_field('subject').max_length
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def tap_activities(log):
+    """Unsaved feed rows for a TimeLog: its time in and, once closed, its time out."""
+    activities = [Activity(user_id=log.officer_id, kind=Activity.TIME_IN, timestamp=log.time_in, subject=str(log.date))]
+    if log.time_out:
+        activities.append(Activity(user_id=log.officer_id, kind=Activity.TIME_OUT, timestamp=log.time_out, subject=str(log.date)))
+    return activities
+
+
+def record_tap(direction, log):
+    """Append the feed row for a live tap; ``direction`` is 'in' or 'out'."""
+    activity = tap_activities(log)[-1 if direction == 'out' else 0]
+    activity.save()
+
+
+def item_activity(user, item, kind, timestamp=None):
+    """Unsaved feed row for ``user`` adding, updating or deleting ``item``.
+
+    ``kind`` is one of Activity.ITEM_ADDED, ITEM_UPDATED or ITEM_DELETED.
+    """
+    return Activity(
+        user_id=user.student_number, kind=kind,
+        timestamp=timestamp or timezone.now(), subject=str(item)[:_SUBJECT_LENGTH],
+    )
+
+
+def cursor(activity):
+    micros = (activity.timestamp - _EPOCH) // _MICROSECOND
+    return f"{micros}.{activity.pk}"
+
+
+def parse_cursor(value):
+    """Split a ``<microseconds>.<id>`` cursor into ``(timestamp, id)``; None if malformed."""
+    micros, _, pk = (value or '').partition('.')
+    if not micros.isdigit() or not pk.isdigit():
+        return None
+    try:
+        timestamp = _EPOCH + int(micros) * _MICROSECOND
+    except OverflowError:
+        return None
+    return timestamp, int(pk)
+
+
+def feed_page(user, size, after=None):
+    """Up to ``size`` of the user's activities, newest first, older than ``after``.
+
+    Returns ``(activities, next_cursor)``; the cursor is None on the last page.
+    """
+    activities = Activity.objects.filter(user_id=user.student_number)
+    if after:
+        timestamp, pk = after
+        activities = activities.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+    page = list(activities.order_by('-timestamp', '-id')[:size + 1])
+    next_cursor = cursor(page[size - 1]) if len(page) > size else None
+    return page[:size], next_cursor
+
+
+# Rebuilding from history ----------------------------------------------------
+
+# LogEntry.action_flag values (ADDITION, CHANGE, DELETION) -> feed kind.
+ITEM_ACTION_KINDS = {1: Activity.ITEM_ADDED, 2: Activity.ITEM_UPDATED, 3: Activity.ITEM_DELETED}
+
+
+def rebuild(batch_size=2000):
+    """Replace the feed with entries rebuilt from TimeLog and the inventory LogEntry rows.
+
+    Returns the number of entries written.
+    """
+    Activity.objects.all().delete()
+    logs = TimeLog.objects.filter(time_in__isnull=False).values_list('officer_id', 'date', 'time_in', 'time_out')
+    entries = LogEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(Item), action_flag__in=ITEM_ACTION_KINDS,
+    ).values_list('user__student_number', 'action_flag', 'action_time', 'object_repr')
+
+    def rows():
+        for officer_id, date, time_in, time_out in logs.iterator(chunk_size=5000):
+            yield officer_id, Activity.TIME_IN, time_in, str(date)
+            if time_out:
+                yield officer_id, Activity.TIME_OUT, time_out, str(date)
+        for student_number, action_flag, action_time, object_repr in entries.iterator(chunk_size=5000):
+            yield student_number, ITEM_ACTION_KINDS[action_flag], action_time, object_repr[:_SUBJECT_LENGTH]
+
+    written = 0
+    iterator = rows()
+    while batch := list(islice(iterator, batch_size)):
+        Activity.objects.bulk_create([
+            Activity(user_id=user_id, kind=kind, timestamp=timestamp, subject=subject)
+            for user_id, kind, timestamp, subject in batch
+        ])
+        written += len(batch)
+    return written
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SyncHubConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'SyncHub'
+
+    def ready(self):
+        from . import active_sessions, profiling  # noqa: F401
@@ -2,6 +2,9 @@
 ASGI config for SyncHub project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The tap endpoints and JSON auth APIs are async views, so serving this with an
+ASGI server (e.g. ``uvicorn SyncHub.asgi:application``) keeps many kiosk and
+browser requests in flight without a large thread pool.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,55 @@
+"""Authentication by student number or email.
+
+``IdentifierBackend`` is ModelBackend with a wider lookup: a 7-digit
+identifier is a student number, anything else an email address. Its async
+path checks the password in a worker thread, since hashing is deliberately
+slow and Django's own ``acheck_password`` hashes on the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+
+from .models import CustomUser
+
+
+def _lookup(identifier):
+    if identifier.isdigit() and len(identifier) == 7:
+        return {'student_number': identifier}
+    return {'email__iexact': identifier}
+
+
+async def _acheck_password(user, password):
+    is_correct, must_update = await sync_to_async(verify_password, thread_sensitive=False)(password, user.password)
+    if is_correct and must_update:
+        user.password = await sync_to_async(make_password, thread_sensitive=False)(password)
+        await user.asave(update_fields=['password'])
+    return is_correct
+
+
+class IdentifierBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = username or kwargs.get(CustomUser.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+        try:
+            user = CustomUser._default_manager.get(**_lookup(username))
+        except (CustomUser.DoesNotExist, CustomUser.MultipleObjectsReturned):
+            # Hash anyway so unknown accounts take as long as wrong passwords.
+            make_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        username = username or kwargs.get(CustomUser.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+        try:
+            user = await CustomUser._default_manager.aget(**_lookup(username))
+        except (CustomUser.DoesNotExist, CustomUser.MultipleObjectsReturned):
+            await sync_to_async(make_password, thread_sensitive=False)(password)
+            return None
+        if await _acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,208 @@
+"""Timed scenarios for the hot views, run by ``manage.py benchmark``.
+
+Each scenario sends one request through the test client as a superuser and
+is repeated a number of times. A run records latency percentiles and query
+counts per scenario, next to the view's query budget; ``compare`` lines two
+runs up so regressions show.
+
+"cold" scenarios bump the report cache version before every request, as a
+data change would, so they time the full computation; "warm" ones time the
+cached path.
+"""
+import json
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from SyncHub import profiling, report_cache, synthetic
+from inventory.models import Item
+from rfid_login.debounce import recent_taps
+from rfid_login.models import OfficerDailyHours, TimeLog
+
+# Items sent per "save" from the inventory grid.
+ITEM_SAVE_BATCH = 100
+
+
+def _recent_range(days):
+    end = timezone.now().date()
+    return {'start_date': (end - timedelta(days=days - 1)).isoformat(), 'end_date': end.isoformat()}
+
+
+def _tap(client, context, i):
+    officer_id = context['tap_officer_ids'][i % len(context['tap_officer_ids'])]
+    return client.post(reverse('rfid_login:login'), {'officer_id': officer_id})
+
+
+def _time_log(client, context, i):
+    return client.get(reverse('rfid_login:time_log'))
+
+
+def _time_log_officer(client, context, i):
+    officer_id = context['officer_ids'][i % len(context['officer_ids'])]
+    return client.get(reverse('rfid_login:time_log'), {'officer_id': officer_id})
+
+
+def _time_reports_month(client, context, i):
+    return client.get(reverse('rfid_login:time_reports'), _recent_range(30))
+
+
+def _time_reports_all(client, context, i):
+    return client.get(reverse('rfid_login:time_reports'))
+
+
+def _export_csv(client, context, i):
+    return client.get(reverse('rfid_login:export_csv'), _recent_range(30))
+
+
+def _export_pdf(client, context, i):
+    return client.get(reverse('rfid_login:export_pdf'), _recent_range(30))
+
+
+def _item_save(client, context, i):
+    first = (i * ITEM_SAVE_BATCH) % max(context['items'] - ITEM_SAVE_BATCH, 1) + 1
+    items = [
+        {'id': item_id, 'name': f'Item {item_id}', 'description': '', 'quantity': str(i % 500), 'location': 'Lab'}
+        for item_id in range(first, first + ITEM_SAVE_BATCH)
+    ]
+    return client.post(
+        reverse('inventory:item_list'),
+        json.dumps({'action': 'save', 'items': items, 'new_items': []}),
+        content_type='application/json',
+    )
+
+
+def _inventory_reports(client, context, i):
+    return client.get(reverse('inventory:inventory_reports'))
+
+
+def _profile(client, context, i):
+    return client.get(reverse('profile'))
+
+
+def _tap_officer_ids(officer_ids):
+    """Officers not on shift today, whose taps the benchmark can undo."""
+    busy = set(TimeLog.objects.filter(date__gte=timezone.now().date()).values_list('officer_id', flat=True))
+    return [officer_id for officer_id in officer_ids if officer_id not in busy] or officer_ids
+
+
+def _reset_taps(context):
+    """Drop the sessions benchmark taps opened, so every run taps in from the same state."""
+    today = timezone.now().date()
+    officers = context['tap_officer_ids']
+    TimeLog.objects.filter(date__gte=today, officer_id__in=officers).delete()
+    OfficerDailyHours.objects.filter(date__gte=today, officer_id__in=officers).delete()
+    report_cache.invalidate('time', [today])
+    recent_taps.clear()
+
+
+def _invalidate(kind):
+    def invalidate(context):
+        report_cache.invalidate_all(kind)
+    return invalidate
+
+
+# (name, request, run before each timed request or None)
+SCENARIOS = [
+    ('tap', _tap, None),
+    ('time_log', _time_log, None),
+    ('time_log_officer', _time_log_officer, None),
+    ('time_reports_30d_cold', _time_reports_month, _invalidate('time')),
+    ('time_reports_30d_warm', _time_reports_month, None),
+    ('time_reports_all_cold', _time_reports_all, _invalidate('time')),
+    ('export_csv_cold', _export_csv, _invalidate('time')),
+    ('export_pdf_cold', _export_pdf, _invalidate('time')),
+    ('item_list_save', _item_save, None),
+    ('inventory_reports_cold', _inventory_reports, _invalidate('inventory')),
+    ('inventory_reports_warm', _inventory_reports, None),
+    ('profile', _profile, None),
+]
+SCENARIO_NAMES = [name for name, request, before in SCENARIOS]
+
+
+def _consume(response):
+    """Read the whole body, so streamed responses are timed to the last byte."""
+    if response.streaming:
+        for chunk in response.streaming_content:
+            pass
+    else:
+        response.content
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 2)
+
+
+def run_scenario(client, context, request, before=None, iterations=20, warmup=2):
+    latencies = []
+    queries = []
+    statuses = set()
+    view_name = None
+    for i in range(warmup + iterations):
+        if before:
+            before(context)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request(client, context, i)
+            _consume(response)
+            elapsed = (time.perf_counter() - started) * 1000
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+        if response.resolver_match:
+            view_name = response.resolver_match.view_name
+    return {
+        'iterations': iterations,
+        'statuses': sorted(statuses),
+        'p50_ms': percentile(latencies, 50),
+        'p90_ms': percentile(latencies, 90),
+        'p99_ms': percentile(latencies, 99),
+        'mean_ms': round(float(np.mean(latencies)), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries_median': int(np.median(queries)),
+        'queries_max': max(queries),
+        'query_budget': profiling.budget_for(view_name).get('queries') if view_name else None,
+    }
+
+
+def run(client, names=None, iterations=20, warmup=2):
+    """Run the named scenarios (all by default) against the current database."""
+    officer_ids = synthetic.officer_ids(synthetic.current_counts()['officers']) or ['0000000']
+    context = {
+        'officer_ids': officer_ids,
+        'tap_officer_ids': _tap_officer_ids(officer_ids),
+        'items': Item.objects.count(),
+    }
+    results = {}
+    for name, request, before in SCENARIOS:
+        if names and name not in names:
+            continue
+        if request is _tap:
+            _reset_taps(context)
+        results[name] = run_scenario(client, context, request, before, iterations, warmup)
+        if request is _tap:
+            _reset_taps(context)
+    return results
+
+
+def compare(previous, current, threshold=10.0):
+    """Rows of ``(name, metric, before, after, change_percent, regressed)``.
+
+    A metric regressed if it grew by more than ``threshold`` percent.
+    """
+    rows = []
+    for name, result in current.items():
+        before = previous.get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p90_ms', 'queries_median'):
+            old, new = before[metric], result[metric]
+            change = (new - old) / old * 100 if old else (0.0 if new == old else float('inf'))
+            rows.append((name, metric, old, new, round(change, 1), change > threshold))
+    return rows
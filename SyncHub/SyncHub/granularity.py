@@ -0,0 +1,58 @@
+"""Time bucketing for report charts over long date ranges.
+
+Reports group their per-date series by day, week or month in the database
+with ``Trunc*``. ``auto`` picks the finest granularity that keeps a range
+to a few dozen points, so chart payloads stay small for any range.
+"""
+from datetime import date
+
+from django.db.models import DateField
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils.dateparse import parse_date
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+AUTO = 'auto'
+CHOICES = (AUTO, DAY, WEEK, MONTH)
+
+# Longest range, in days, that ``auto`` still shows per day / per week.
+AUTO_DAY_MAX_DAYS = 62
+AUTO_WEEK_MAX_DAYS = 366
+
+_TRUNC = {DAY: TruncDay, WEEK: TruncWeek, MONTH: TruncMonth}
+_LABEL_FORMATS = {DAY: '%b %d', WEEK: 'Wk of %b %d', MONTH: '%b %Y'}
+
+
+def normalize(value):
+    """Return a valid granularity choice, defaulting to ``auto``."""
+    return value if value in CHOICES else AUTO
+
+
+def resolve(granularity, first, last):
+    """Turn ``auto`` into day, week or month for the span ``first``..``last``."""
+    if granularity != AUTO:
+        return granularity
+    if first is None or last is None:
+        return DAY
+    if isinstance(first, str):
+        first = parse_date(first)
+    if isinstance(last, str):
+        last = parse_date(last)
+    days = (last - first).days + 1
+    if days <= AUTO_DAY_MAX_DAYS:
+        return DAY
+    if days <= AUTO_WEEK_MAX_DAYS:
+        return WEEK
+    return MONTH
+
+
+def trunc(granularity, field):
+    """Database expression truncating ``field`` to the start of its bucket."""
+    return _TRUNC[granularity](field, output_field=DateField())
+
+
+def label(granularity, value):
+    if not isinstance(value, date):
+        value = parse_date(str(value))
+    return value.strftime(_LABEL_FORMATS[granularity])
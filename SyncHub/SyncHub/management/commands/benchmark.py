@@ -0,0 +1,169 @@
+import json
+import logging
+import platform
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from SyncHub import benchmark, synthetic
+from SyncHub.models import CustomUser
+
+BENCHMARK_USER = '9999999'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a separate benchmark database with synthetic data and time the hot views. "
+        "Works on SQLite and PostgreSQL; the configured database is never written to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--officers', type=int, default=2000)
+        parser.add_argument('--logs', type=int, default=5_000_000, help="TimeLog rows to seed.")
+        parser.add_argument('--items', type=int, default=50_000, help="Inventory items to seed.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed for the synthetic data.")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests before each scenario.")
+        parser.add_argument(
+            '--scenario', action='append', choices=benchmark.SCENARIO_NAMES, dest='scenarios',
+            help="Run only this scenario; repeat for several.",
+        )
+        parser.add_argument(
+            '--database-name',
+            help="Benchmark database to create (default: benchmark.sqlite3 next to manage.py "
+                 "on SQLite, benchmark_<NAME> elsewhere).",
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help="Keep the benchmark database and reuse its data on the next run if the volumes match.",
+        )
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="JSON results of an earlier run to compare against.")
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help="Percent increase that counts as a regression when comparing.",
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help="Exit with an error if --compare finds a regression.",
+        )
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        test_settings['NAME'] = options['database_name'] or self._default_database_name()
+        setup_test_environment()
+        # The results table covers what the per-request profiling log would say.
+        logging.getLogger('SyncHub.profiling').setLevel(logging.ERROR)
+        old_name = connection.creation.create_test_db(
+            verbosity=options['verbosity'], autoclobber=not options['interactive'], keepdb=options['keepdb'],
+        )
+        try:
+            # Measure views that go over their query budget instead of
+            # aborting on the first one, whatever the settings say.
+            with override_settings(PROFILING_FAIL_ON_BUDGET=False):
+                report = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, options['verbosity'], keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self._print_results(report['results'])
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if previous:
+            self._compare(previous, report, options)
+
+    def _default_database_name(self):
+        if connection.vendor == 'sqlite':
+            return str(settings.BASE_DIR / 'benchmark.sqlite3')
+        return f"benchmark_{connection.settings_dict['NAME']}"
+
+    def _run(self, options):
+        self.stdout.write(
+            f"Seeding {options['officers']} officers, {options['logs']} time logs, {options['items']} items..."
+        )
+        seeded = synthetic.seed(
+            options['officers'], options['logs'], options['items'], seed=options['seed'],
+            progress=self._progress(options['logs']),
+        )
+        if not seeded:
+            self.stdout.write("Reusing existing data.")
+
+        user = CustomUser.objects.filter(student_number=BENCHMARK_USER).first()
+        if user is None:
+            user = CustomUser.objects.create_superuser(
+                student_number=BENCHMARK_USER, username='benchmark', password=None,
+                first_name='Bench', last_name='Mark', email='benchmark@example.com',
+            )
+        client = Client()
+        client.force_login(user)
+
+        results = benchmark.run(client, options['scenarios'], options['iterations'], options['warmup'])
+        return {
+            'meta': {
+                'started_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'officers': options['officers'],
+                'logs': options['logs'],
+                'items': options['items'],
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'results': results,
+        }
+
+    def _progress(self, total):
+        step = max(total // 20, 1)
+        next_report = step
+
+        def progress(written):
+            nonlocal next_report
+            if written >= next_report or written == total:
+                self.stdout.write(f"  {written}/{total} time logs")
+                next_report = written + step
+        return progress
+
+    def _print_results(self, results):
+        self.stdout.write(
+            f"\n{'scenario':<26}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'queries':>9}{'budget':>8}  status"
+        )
+        for name, result in results.items():
+            budget = result.get('query_budget')
+            line = (
+                f"{name:<26}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['max_ms']:>10.2f}{result['queries_median']:>9}{budget if budget is not None else '-':>8}  "
+                f"{','.join(str(status) for status in result['statuses'])}"
+            )
+            over_budget = budget is not None and result['queries_max'] > budget
+            self.stdout.write(self.style.WARNING(line) if over_budget else line)
+
+    def _compare(self, previous, report, options):
+        if previous['meta'].get('database') != report['meta']['database'] or any(
+            previous['meta'].get(key) != report['meta'][key] for key in ('officers', 'logs', 'items')
+        ):
+            self.stderr.write("Warning: the compared run used a different database or data volume.")
+
+        rows = benchmark.compare(previous['results'], report['results'], options['threshold'])
+        self.stdout.write(f"\n{'scenario':<26}{'metric':<16}{'before':>10}{'after':>10}{'change':>9}")
+        for name, metric, before, after, change, regressed in rows:
+            line = f"{name:<26}{metric:<16}{before:>10}{after:>10}{change:>8}%"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+        regressions = [row for row in rows if row[5]]
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} metrics regressed by more than {options['threshold']}%.")
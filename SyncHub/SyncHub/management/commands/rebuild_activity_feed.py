@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from SyncHub import activity
+
+
+class Command(BaseCommand):
+    help = "Rebuild the profile activity feed from TimeLog and the inventory change log."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = activity.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} activity feed entries."))
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from SyncHub import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic officers, users, time logs and inventory items "
+        "for load and scale testing. Uses COPY on PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--officers', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=2000, help="Synthetic user accounts.")
+        parser.add_argument('--logs', type=int, default=5_000_000, help="TimeLog rows.")
+        parser.add_argument('--items', type=int, default=50_000, help="Inventory items.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk_create on non-PostgreSQL databases.")
+        parser.add_argument(
+            '--flush', action='store_true',
+            help="Replace existing officers, time logs and items. Without it the command refuses to touch "
+                 "a database that already has them.",
+        )
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        counts = synthetic.current_counts()
+        if (counts['officers'] or counts['logs'] or counts['items']) and not options['flush']:
+            raise CommandError(
+                f"The database already has {counts['officers']} officers, {counts['logs']} time logs and "
+                f"{counts['items']} items. Use --flush to replace them."
+            )
+        if options['interactive']:
+            settings_dict = connection.settings_dict
+            answer = input(
+                f"This writes synthetic data to {settings_dict['NAME']!r} on "
+                f"{settings_dict.get('HOST') or 'localhost'}"
+                f"{' and deletes all officers, time logs and items' if options['flush'] else ''}. "
+                "Type 'yes' to continue: "
+            )
+            if answer != 'yes':
+                raise CommandError("Seeding cancelled.")
+
+        started = time.monotonic()
+        seeded = synthetic.seed(
+            options['officers'], options['logs'], options['items'], users=options['users'],
+            seed=options['seed'], batch_size=options['batch_size'], progress=self._progress(options['logs']),
+            flush=options['flush'],
+        )
+        if not seeded:
+            self.stdout.write("The database already holds this data; nothing written.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['officers']} officers, {options['users']} users, {options['logs']} time logs "
+            f"and {options['items']} items in {time.monotonic() - started:.1f}s."
+        ))
+
+    def _progress(self, total):
+        step = max(total // 20, 1)
+        next_report = step
+
+        def progress(written):
+            nonlocal next_report
+            if written >= next_report or written == total:
+                self.stdout.write(f"  {written}/{total} time logs")
+                next_report = written + step
+        return progress
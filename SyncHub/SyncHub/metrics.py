@@ -0,0 +1,295 @@
+"""In-process counters and histograms, exposed in Prometheus text format.
+
+Metrics are declared at the bottom of this module and updated where the
+work happens (taps, the login API, report computation, exports). The
+``metrics`` view renders them for Prometheus to scrape.
+
+Each worker process keeps its own numbers. With ``METRICS_DIR`` set, every
+process also writes a snapshot to ``<METRICS_DIR>/process-<id>.json`` every
+``METRICS_FLUSH_INTERVAL`` seconds, and the view adds up the snapshots of
+all processes, so a scrape of any worker covers the whole server. The id is
+the pid plus a random suffix, so a reused pid can't overwrite a dead
+worker's snapshot. Each process holds a lock on its ``process-<id>.lock``
+while it runs; a scrape that can take one knows the process is gone, and
+folds its snapshot into ``archive.json`` so counters don't go backwards.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; exited processes' snapshots are kept as they are.
+    fcntl = None
+
+from django.conf import settings
+
+# Upper bounds, in seconds, for latency histograms.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+_metrics = {}
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics[name] = self
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} takes labels {self.labels}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(value) if isinstance(value, list) else value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _schedule_flush()
+
+
+class Histogram(Metric):
+    """Bucket counts are stored per bucket and made cumulative when rendered."""
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            # One count per bucket plus +Inf, then the sum.
+            values = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            values[index] += 1
+            values[-1] += value
+        _schedule_flush()
+
+
+def snapshot():
+    """Current values of every metric in this process, JSON-serializable."""
+    return {name: metric.snapshot() for name, metric in _metrics.items()}
+
+
+def merge(snapshots):
+    """Add up per-process snapshots into ``{name: {label_values: value}}``."""
+    merged = {name: {} for name in _metrics}
+    for data in snapshots:
+        for name, samples in data.items():
+            if name not in merged:
+                continue
+            totals = merged[name]
+            for key, value in samples:
+                key = tuple(key)
+                if isinstance(value, list):
+                    current = totals.setdefault(key, [0] * len(value))
+                    totals[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    totals[key] = totals.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, metric in _metrics.items():
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for key, value in sorted(merged.get(name, {}).items()):
+            if metric.type == 'counter':
+                lines.append(f'{name}{_labels(metric.labels, key)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, math.inf), value[:-1]):
+                cumulative += count
+                le = _number(float(bound))
+                lines.append(f'{name}_bucket{_labels(metric.labels, key, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labels, key)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(metric.labels, key)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+# Multi-process snapshots ---------------------------------------------------
+
+_flush_state = {'pid': None, 'dirty': False}
+_flush_lock = threading.Lock()
+# This process's snapshot id and the lock file held open while it runs.
+_process = {'pid': None, 'id': None, 'lock': None}
+_write_lock = threading.Lock()
+
+
+def metrics_dir():
+    path = getattr(settings, 'METRICS_DIR', None)
+    return Path(path) if path else None
+
+
+def _process_id(directory):
+    """Snapshot id of this process; a forked worker gets a new one."""
+    pid = os.getpid()
+    if _process['pid'] != pid:
+        _process.update(pid=pid, id=f'{pid}-{uuid.uuid4().hex[:12]}', lock=None)
+    if _process['lock'] is None and fcntl is not None:
+        # Kept open for the life of the process; the OS releases it on exit.
+        lock = open(directory / f"process-{_process['id']}.lock", 'w')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _process['lock'] = lock
+    return _process['id']
+
+
+def _write_json(path, data):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        # Missing, or half-written by a process that died mid-write.
+        return None
+
+
+def flush():
+    """Write this process's snapshot to METRICS_DIR, if configured."""
+    directory = metrics_dir()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    with _write_lock:
+        _write_json(directory / f'process-{_process_id(directory)}.json', snapshot())
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        with _flush_lock:
+            dirty, _flush_state['dirty'] = _flush_state['dirty'], False
+        if dirty:
+            flush()
+
+
+def _schedule_flush():
+    """Mark the snapshot stale and make sure this process has a flusher thread.
+
+    The thread is started lazily and per pid, since threads don't survive
+    a fork of a preloaded worker.
+    """
+    if metrics_dir() is None:
+        return
+    with _flush_lock:
+        _flush_state['dirty'] = True
+        if _flush_state['pid'] == os.getpid():
+            return
+        _flush_state['pid'] = os.getpid()
+    interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+    threading.Thread(target=_flush_loop, args=(interval,), name='metrics-flush', daemon=True).start()
+
+
+def _as_snapshot(merged):
+    return {name: [[list(key), value] for key, value in samples.items()] for name, samples in merged.items()}
+
+
+def _fold_exited(directory):
+    """Add the snapshots of exited processes to the archive and delete them.
+
+    Call with the archive lock held.
+    """
+    archive_path = directory / 'archive.json'
+    archive = _read_json(archive_path) or {}
+    folded = []
+    for lock_path in directory.glob('process-*.lock'):
+        if lock_path.stem == f"process-{_process['id']}":
+            continue
+        with open(lock_path, 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue  # Still running.
+            data = _read_json(lock_path.with_suffix('.json'))
+            if data:
+                archive = _as_snapshot(merge([archive, data]))
+            folded.append(lock_path)
+    if not folded:
+        return
+    _write_json(archive_path, archive)
+    for lock_path in folded:
+        for path in (lock_path.with_suffix('.json'), lock_path.with_suffix('.tmp'), lock_path):
+            path.unlink(missing_ok=True)
+
+
+def collect():
+    """Merged metrics of every process sharing METRICS_DIR, or just this one."""
+    directory = metrics_dir()
+    if directory is None:
+        return merge([snapshot()])
+    flush()
+    with open(directory / 'archive.lock', 'a') as archive_lock:
+        # Folding and reading happen under one lock, so no scrape sees a
+        # snapshot both on its own and in the archive.
+        if fcntl is not None:
+            fcntl.flock(archive_lock, fcntl.LOCK_EX)
+            _fold_exited(directory)
+        paths = [directory / 'archive.json', *directory.glob('process-*.json')]
+        snapshots = [data for data in map(_read_json, paths) if data]
+    return merge(snapshots)
+
+
+atexit.register(flush)
+
+
+# Metrics -------------------------------------------------------------------
+
+taps = Counter('synchub_taps_total', 'Live kiosk taps by outcome (in, out, duplicate, invalid).', ['outcome'])
+tap_seconds = Histogram('synchub_tap_duration_seconds', 'Time to handle a live kiosk tap.', ['outcome'])
+batch_taps = Counter(
+    'synchub_batch_taps_total',
+    'Taps uploaded in offline batches by result (applied, duplicate, debounced, stale, rejected).',
+    ['result'],
+)
+logins = Counter('synchub_login_attempts_total', 'Login API attempts by result (success, failure, invalid).', ['result'])
+report_cache_requests = Counter(
+    'synchub_report_cache_requests_total',
+    'Report cache lookups by result (hit, miss, wait).', ['kind', 'result'],
+)
+report_compute_seconds = Histogram(
+    'synchub_report_compute_seconds', 'Time to compute a report on a cache miss.', ['kind'],
+)
+export_bytes = Histogram('synchub_export_bytes', 'Size of rendered exports.', ['format'], buckets=SIZE_BUCKETS)
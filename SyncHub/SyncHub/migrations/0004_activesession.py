@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SyncHub', '0003_auto_20251112_0423'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveSession',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='sessions.session')),
+                ('logged_in_at', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('expire_date', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='active_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expire_date', 'user'], name='activesession_expire_user_idx'), models.Index(fields=['user', '-last_seen'], name='activesession_user_seen_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+def populate_feed(apps, schema_editor):
+    Activity = apps.get_model('SyncHub', 'Activity')
+    TimeLog = apps.get_model('rfid_login', 'TimeLog')
+    LogEntry = apps.get_model('admin', 'LogEntry')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    item_type = ContentType.objects.filter(app_label='inventory', model='item').first()
+    # LogEntry.action_flag: ADDITION, CHANGE, DELETION.
+    item_kinds = {1: 'item_added', 2: 'item_updated', 3: 'item_deleted'}
+
+    def rows():
+        logs = TimeLog.objects.filter(time_in__isnull=False).values_list('officer_id', 'date', 'time_in', 'time_out')
+        for officer_id, date, time_in, time_out in logs.iterator(chunk_size=5000):
+            yield Activity(user_id=officer_id, kind='time_in', timestamp=time_in, subject=str(date))
+            if time_out:
+                yield Activity(user_id=officer_id, kind='time_out', timestamp=time_out, subject=str(date))
+        if item_type is None:
+            return
+        entries = LogEntry.objects.filter(content_type_id=item_type.pk, action_flag__in=item_kinds).values_list(
+            'user__student_number', 'action_flag', 'action_time', 'object_repr',
+        )
+        for student_number, action_flag, action_time, object_repr in entries.iterator(chunk_size=5000):
+            yield Activity(user_id=student_number, kind=item_kinds[action_flag], timestamp=action_time, subject=object_repr[:200])
+
+    iterator = rows()
+    while batch := list(islice(iterator, 2000)):
+        Activity.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SyncHub', '0004_activesession'),
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('rfid_login', '0013_timelog_duration_seconds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('time_in', 'Time In'), ('time_out', 'Time Out'), ('item_added', 'Added inventory item'), ('item_updated', 'Updated inventory item'), ('item_deleted', 'Deleted inventory item')], max_length=20)),
+                ('timestamp', models.DateTimeField()),
+                ('subject', models.CharField(max_length=200)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL, to_field='student_number')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-timestamp', '-id'], name='activity_user_recent_idx')],
+            },
+        ),
+        migrations.RunPython(populate_feed, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.sessions.models import Session
 from django.core.validators import RegexValidator
+from django.utils import timezone
 
 class CustomUser(AbstractUser):
     student_number = models.CharField(
@@ -16,3 +19,66 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+class ActiveSession(models.Model):
+    """A logged-in session, so "who's online" is an indexed query.
+
+    Rows are written on login, refreshed by ``ActiveSessionMiddleware`` and
+    removed on logout. They cascade with their ``django_session`` row, so
+    ``manage.py clearsessions`` clears expired ones too.
+    """
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='active_sessions')
+    logged_in_at = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    # Copy of the session's expiry, so online queries don't join django_session.
+    expire_date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expire_date', 'user'], name='activesession_expire_user_idx'),
+            models.Index(fields=['user', '-last_seen'], name='activesession_user_seen_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.session_id}"
+
+class Activity(models.Model):
+    """One entry in a user's activity feed, shown on the profile page.
+
+    Rows are appended when an officer taps in or out and when a user changes
+    inventory, and never updated. ``user`` points at the student number, so
+    taps of officers who register an account later already show up.
+    """
+    TIME_IN = 'time_in'
+    TIME_OUT = 'time_out'
+    ITEM_ADDED = 'item_added'
+    ITEM_UPDATED = 'item_updated'
+    ITEM_DELETED = 'item_deleted'
+    KIND_CHOICES = [
+        (TIME_IN, 'Time In'),
+        (TIME_OUT, 'Time Out'),
+        (ITEM_ADDED, 'Added inventory item'),
+        (ITEM_UPDATED, 'Updated inventory item'),
+        (ITEM_DELETED, 'Deleted inventory item'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, to_field='student_number', db_constraint=False,
+        on_delete=models.CASCADE, related_name='activities',
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    timestamp = models.DateTimeField()
+    # The tap's date, or the item's name as it was at the time.
+    subject = models.CharField(max_length=200)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-timestamp', '-id'], name='activity_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        if self.kind in (self.TIME_IN, self.TIME_OUT):
+            at = timezone.localtime(self.timestamp).strftime('%I:%M %p')
+            return f"{self.get_kind_display()}: {self.subject} at {at}"
+        return f"{self.get_kind_display()}: {self.subject}"
@@ -0,0 +1,165 @@
+"""Per-request SQL and latency profiling.
+
+``QueryProfilingMiddleware`` counts the queries each request runs, their
+total database time, repeated statements (the usual sign of an N+1 loop)
+and wall time. Every request is logged to the ``SyncHub.profiling`` logger
+as ``key=value`` pairs, with the same data under ``extra['profile']`` for
+structured log handlers. ``PROFILING_SERVER_TIMING`` adds a
+``Server-Timing`` header so the numbers show up in browser dev tools.
+
+Budgets are set per view name in ``PROFILING_BUDGETS`` (with
+``PROFILING_DEFAULT_BUDGET`` for the rest). Going over one logs a warning,
+or raises ``BudgetExceeded`` when ``PROFILING_FAIL_ON_BUDGET`` is set, as
+test settings should do.
+
+Queries are seen through a database execute wrapper installed on every new
+connection. The active profile lives in a ContextVar, so queries that
+async views run through ``sync_to_async`` are attributed to their request.
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_current_profile = ContextVar('request_profile', default=None)
+
+BUDGET_KEYS = ('queries', 'db_ms', 'duplicates', 'wall_ms')
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+        self.started = time.perf_counter()
+        self.wall_seconds = None
+
+    def record(self, sql, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Executions of a statement beyond its first."""
+        return sum(count - 1 for count in self.statements.values())
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_seconds * 1000, 2),
+            'duplicates': self.duplicates,
+            'wall_ms': round(self.wall_seconds * 1000, 2),
+        }
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record(sql, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def _install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def budget_for(view_name):
+    budgets = getattr(settings, 'PROFILING_BUDGETS', {})
+    budget = dict(getattr(settings, 'PROFILING_DEFAULT_BUDGET', {}))
+    budget.update(budgets.get(view_name, {}))
+    return budget
+
+
+def check_budget(view_name, stats):
+    """Return ``[(key, value, limit), ...]`` for every budget the stats exceed."""
+    budget = budget_for(view_name)
+    return [
+        (key, stats[key], budget[key])
+        for key in BUDGET_KEYS
+        if budget.get(key) is not None and stats[key] > budget[key]
+    ]
+
+
+class QueryProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._report(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._report(request, response, profile)
+
+    def _report(self, request, response, profile):
+        # Streaming responses are measured up to the first byte.
+        profile.finish()
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else request.path
+        stats = profile.as_dict()
+
+        logger.info(
+            'view=%s method=%s status=%s queries=%d db_ms=%.2f duplicates=%d wall_ms=%.2f',
+            view_name, request.method, response.status_code, stats['queries'],
+            stats['db_ms'], stats['duplicates'], stats['wall_ms'],
+            extra={'profile': {'view': view_name, 'method': request.method, 'status': response.status_code, **stats}},
+        )
+
+        if getattr(settings, 'PROFILING_SERVER_TIMING', False):
+            response['Server-Timing'] = (
+                f'db;dur={stats["db_ms"]};desc="{stats["queries"]} queries", '
+                f'app;dur={stats["wall_ms"]}'
+            )
+
+        exceeded = check_budget(view_name, stats)
+        if exceeded:
+            details = ', '.join(f'{key}={value} (budget {limit})' for key, value, limit in exceeded)
+            repeated = [sql for sql, count in profile.statements.most_common(3) if count > 1]
+            if getattr(settings, 'PROFILING_FAIL_ON_BUDGET', False):
+                raise BudgetExceeded(f'{view_name} exceeded its budget: {details}; repeated: {repeated}')
+            logger.warning('%s exceeded its budget: %s; most repeated: %s', view_name, details, repeated)
+        return response
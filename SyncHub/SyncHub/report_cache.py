@@ -0,0 +1,149 @@
+"""Caching for computed report dictionaries.
+
+Results are keyed by report kind, the normalized date range and a data
+version. The version is built from per-month tokens, so a write only
+invalidates cached ranges that include its month. Open-ended or very long
+ranges use a single "all" token that every write changes.
+
+Concurrent misses for the same key are collapsed: one caller computes while
+the others wait for the result instead of all hitting the database. The same
+version backs the ETags of the JSON report endpoints, so an unchanged range
+is answered with 304 Not Modified before anything is computed.
+"""
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from SyncHub import metrics
+
+# Ranges spanning more months than this share the "all" token.
+MAX_BUCKETED_MONTHS = 24
+LOCK_TIMEOUT = 30  # seconds a computing caller may hold the stampede lock
+WAIT_INTERVAL = 0.05
+
+_local_locks = [threading.Lock() for _ in range(64)]
+
+
+def normalize_date(value):
+    """Return an ISO date string, or None for missing or malformed input."""
+    if not value:
+        return None
+    try:
+        parsed = parse_date(str(value))
+    except ValueError:
+        return None
+    return parsed.isoformat() if parsed else None
+
+
+def _token_key(kind, bucket):
+    return f'report:{kind}:token:{bucket}'
+
+
+def _month_buckets(start, end):
+    start, end = parse_date(start), parse_date(end)
+    first = start.year * 12 + start.month - 1
+    last = end.year * 12 + end.month - 1
+    if last < first:
+        return []
+    if last - first >= MAX_BUCKETED_MONTHS:
+        return None
+    return [f'{month // 12}-{month % 12 + 1:02d}' for month in range(first, last + 1)]
+
+
+def data_version(kind, start_date=None, end_date=None):
+    """Opaque version string that changes whenever data in the range changes."""
+    buckets = None
+    if start_date and end_date:
+        buckets = _month_buckets(start_date, end_date)
+    if buckets is None:
+        buckets = ['all']
+    keys = [_token_key(kind, bucket) for bucket in ['generation'] + buckets]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # A fresh random token (rather than a counter) means an evicted
+            # token can never line up with a stale cached result.
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            tokens[key] = cache.get(key)
+    digest = hashlib.sha1('|'.join(str(tokens[key]) for key in keys).encode()).hexdigest()
+    return digest[:16]
+
+
+def etag(kind, start_date=None, end_date=None, variant=''):
+    """Strong ETag for a report response; changes with the data version."""
+    version = data_version(kind, start_date, end_date)
+    raw = f'{kind}|{variant}|{start_date or ""}|{end_date or ""}|{version}'
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _bump(kind, dates):
+    # Instances created with a string date keep it as a string until reloaded.
+    dates = [parse_date(date) if isinstance(date, str) else date for date in dates]
+    buckets = {f'{date.year}-{date.month:02d}' for date in dates if date}
+    buckets.add('all')
+    cache.set_many({_token_key(kind, bucket): uuid.uuid4().hex for bucket in buckets}, timeout=None)
+
+
+def invalidate(kind, dates):
+    """Invalidate cached reports covering any of ``dates`` after commit."""
+    dates = set(dates)
+    if dates:
+        transaction.on_commit(lambda: _bump(kind, dates))
+
+
+def invalidate_all(kind):
+    """Invalidate every cached report of this kind after commit."""
+    transaction.on_commit(lambda: cache.set(_token_key(kind, 'generation'), uuid.uuid4().hex, timeout=None))
+
+
+def _compute(kind, compute):
+    metrics.report_cache_requests.inc(kind=kind, result='miss')
+    started = time.perf_counter()
+    value = compute()
+    metrics.report_compute_seconds.observe(time.perf_counter() - started, kind=kind)
+    return value
+
+
+def get_or_compute(kind, start_date, end_date, compute, variant=''):
+    """Return the cached report for the range, computing it at most once.
+
+    ``variant`` distinguishes different results computed from the same
+    kind of data, so they share its invalidation but not its cache entry.
+    """
+    version = data_version(kind, start_date, end_date)
+    name = f'{kind}:{variant}' if variant else kind
+    key = f'report:{name}:{start_date or ""}:{end_date or ""}:{version}'
+    value = cache.get(key)
+    if value is not None:
+        metrics.report_cache_requests.inc(kind=kind, result='hit')
+        return value
+
+    with _local_locks[hash(key) % len(_local_locks)]:
+        value = cache.get(key)
+        if value is not None:
+            metrics.report_cache_requests.inc(kind=kind, result='wait')
+            return value
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            try:
+                value = _compute(kind, compute)
+                cache.set(key, value, timeout=getattr(settings, 'REPORT_CACHE_TIMEOUT', 600))
+                return value
+            finally:
+                cache.delete(lock_key)
+
+        # Another process is computing the same report; wait for its result.
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                metrics.report_cache_requests.inc(kind=kind, result='wait')
+                return value
+        return _compute(kind, compute)
@@ -0,0 +1,81 @@
+"""Role checks resolved once per request instead of once per call.
+
+``RolesMiddleware`` adds a lazy ``request.roles`` (and ``await
+request.aroles()`` for async views). The user's group names are loaded
+with one query the first time a request needs them and memoized on the
+user object, so later checks in the same request cost nothing. They are
+not cached across requests: with a per-process cache, a revoked role would
+linger in every other worker.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+ADMIN_GROUPS = ('Executive Officer', 'Staff')
+
+
+class Roles:
+    def __init__(self, is_superuser=False, groups=()):
+        self.is_superuser = is_superuser
+        self.groups = frozenset(groups)
+
+    def has(self, *names):
+        """True if the user is in any of the named groups."""
+        return not self.groups.isdisjoint(names)
+
+    @property
+    def is_executive_or_staff(self):
+        return self.has(*ADMIN_GROUPS)
+
+    @property
+    def is_admin(self):
+        """Superusers, Executive Officers and Staff."""
+        return self.is_superuser or self.is_executive_or_staff
+
+
+ANONYMOUS = Roles()
+
+
+def roles_for(user):
+    if not user.is_authenticated:
+        return ANONYMOUS
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        groups = user.groups.values_list('name', flat=True)
+        roles = user._roles = Roles(user.is_superuser, groups)
+    return roles
+
+
+async def aroles_for(user):
+    if not user.is_authenticated:
+        return ANONYMOUS
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        groups = [name async for name in user.groups.values_list('name', flat=True)]
+        roles = user._roles = Roles(user.is_superuser, groups)
+    return roles
+
+
+class RolesMiddleware:
+    """Adds ``request.roles`` and ``request.aroles()``. Goes after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.roles = SimpleLazyObject(lambda: roles_for(request.user))
+
+        async def aroles():
+            return await aroles_for(await request.auser())
+
+        request.aroles = aroles
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
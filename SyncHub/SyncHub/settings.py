@@ -62,11 +62,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'SyncHub.profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'SyncHub.roles.RolesMiddleware',
+    'SyncHub.active_sessions.ActiveSessionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -106,6 +109,22 @@ DATABASES = {
 }
 
 
+# Cache
+# Report results and their version tokens live here. The local-memory cache
+# is per process; point this at Redis or Memcached when running several
+# workers so they share results and the stampede lock.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+REPORT_CACHE_TIMEOUT = 600  # seconds
+
+
+# Users log in with their student number or email address.
+AUTHENTICATION_BACKENDS = ['SyncHub.backends.IdentifierBackend']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -168,3 +187,62 @@ DEFAULT_FROM_EMAIL = 'daenerys23.1986@gmail.com'
 LOGIN_URL = '/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
+
+# RFID tap handling
+# Scanned IDs are resolved through a per-process LRU cache. Unknown IDs are
+# cached for a shorter time so a newly registered card starts working quickly.
+RFID_OFFICER_CACHE_SIZE = 2048
+RFID_OFFICER_CACHE_TTL = 300  # seconds
+RFID_OFFICER_CACHE_NEGATIVE_TTL = 15  # seconds
+RFID_TAP_BATCH_LIMIT = 10000  # taps per bulk upload
+# Readers authenticate to the tap APIs with "Authorization: Bearer <token>".
+# While unset, both tap APIs reject every request.
+RFID_READER_TOKEN = None
+# Repeat scans of the same card within this window are ignored (0 disables).
+RFID_TAP_DEBOUNCE_SECONDS = 2.0
+RFID_TAP_DEBOUNCE_BUFFER = 1024  # recently seen taps kept for debouncing
+# Fan-out for live time log events. The in-process broadcaster only reaches
+# clients of the same worker; use rfid_login.events.PostgresNotifyBroadcaster
+# when running several workers.
+RFID_EVENT_BACKEND = 'rfid_login.events.InProcessBroadcaster'
+
+# Rows fetched per round trip when streaming exports.
+EXPORT_STREAM_CHUNK_SIZE = 2000
+
+# Rendered report downloads written by ``manage.py run_report_worker``.
+REPORT_ARTIFACT_DIR = BASE_DIR / 'report_artifacts'
+REPORT_JOB_TIMEOUT = 600  # seconds before a running job is handed to another worker
+
+# Rows per page on the time log listing.
+TIME_LOG_PAGE_SIZE = 50
+
+# Per-request query/latency profiling (SyncHub.profiling). Budgets map view
+# names to limits on 'queries', 'db_ms', 'duplicates' and 'wall_ms'.
+# SyncHub.test_settings sets PROFILING_FAIL_ON_BUDGET so overruns fail tests.
+PROFILING_ENABLED = True
+PROFILING_SERVER_TIMING = DEBUG
+PROFILING_FAIL_ON_BUDGET = False
+PROFILING_DEFAULT_BUDGET = {'queries': 50, 'duplicates': 10, 'wall_ms': 2000}
+PROFILING_BUDGETS = {
+    'rfid_login:time_log': {'queries': 8, 'duplicates': 0},
+    'rfid_login:time_reports': {'queries': 15},
+    'rfid_login:time_reports_data_api': {'queries': 8},
+    'rfid_login:tap_api': {'queries': 10, 'wall_ms': 500},
+    # Long-lived event stream; only the setup is measured.
+    'rfid_login:time_log_stream': {'wall_ms': None},
+}
+
+# Prometheus metrics at /metrics (SyncHub.metrics), for superusers or
+# scrapers sending "Authorization: Bearer <METRICS_TOKEN>". With several
+# worker processes, point METRICS_DIR at a directory they all share so any
+# worker's /metrics adds up all of them; clear it on deploy.
+METRICS_TOKEN = None
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5  # seconds between per-process snapshot writes
+
+# Logged-in session registry (SyncHub.active_sessions): seconds between
+# last_seen updates for the same session.
+ACTIVE_SESSION_TOUCH_INTERVAL = 60
+
+# Entries per page of the profile page's activity feed (SyncHub.activity).
+PROFILE_ACTIVITY_PAGE_SIZE = 10
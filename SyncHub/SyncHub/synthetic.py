@@ -0,0 +1,314 @@
+"""Synthetic officers, users, time logs and inventory items at realistic volumes.
+
+Used by ``manage.py seed_synthetic_data`` and ``manage.py benchmark``.
+Generation is seeded, so two runs at the same volumes produce the same
+rows and their timings can be compared.
+
+Officers work one of a few shifts, mostly on weekdays, and now and then
+split a day into two sessions. Those on shift right now have an open
+session today. Time logs are written with their ``duration_seconds`` and
+the matching ``OfficerDailyHours`` rows, so no backfill or rollup rebuild
+is needed afterwards. Item names follow a skewed distribution, a handful
+of common names making up most of the inventory.
+
+Rows go in with ``COPY`` on PostgreSQL and batched ``bulk_create``
+elsewhere.
+"""
+import csv
+import io
+import random
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from SyncHub import report_cache
+from SyncHub.models import Activity, CustomUser
+from inventory.models import Item
+from rfid_login.models import Officer, OfficerDailyHours, TapReceipt, TimeLog
+
+# Officers and users share the 7-digit ID space, so the first officers
+# have accounts under the same student number.
+ID_START = 1000000
+USER_EMAIL_DOMAIN = 'synthetic.invalid'
+POSITIONS = ('Officer', 'Officer', 'Officer', 'Senior Officer', 'Staff', 'Executive Officer')
+FIRST_NAMES = ('Ana', 'Ben', 'Carla', 'Dan', 'Elena', 'Felix', 'Gia', 'Hugo', 'Iris', 'Jon', 'Kim', 'Luis')
+LAST_NAMES = ('Santos', 'Reyes', 'Cruz', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Ramos', 'Lim', 'Tan')
+# (group, share of users in it); everyone is also an Officer.
+ROLE_SHARES = (('Staff', 0.05), ('Executive Officer', 0.01))
+
+# (start hour UTC, hours, share of officers)
+SHIFTS = ((6, 8, 0.35), (9, 8, 0.45), (14, 8, 0.20))
+WEEKDAY_ATTENDANCE = 0.85
+WEEKEND_ATTENDANCE = 0.20
+# Share of worked days split into two sessions around a break.
+SPLIT_DAY_RATE = 0.10
+
+ITEM_NAMES = (
+    'Cable', 'Marker', 'Folder', 'Badge', 'Chair', 'Radio', 'Laptop', 'Extension Cord',
+    'Projector', 'Whiteboard', 'Stapler', 'Tripod', 'Speaker', 'Router', 'Tent', 'Banner',
+)
+# Zipf-like: the n-th name is picked about 1/n as often as the first.
+ITEM_NAME_WEIGHTS = tuple(1 / rank for rank in range(1, len(ITEM_NAMES) + 1))
+LOCATIONS = ('Main Office', 'Storage A', 'Storage B', 'Lobby', 'Lab', '')
+LOCATION_WEIGHTS = (5, 3, 3, 1, 1, 1)
+ITEM_HISTORY_DAYS = 365
+
+COPY_BATCH_SIZE = 50000
+
+
+def officer_ids(count):
+    return [f'{ID_START + n:07d}' for n in range(count)]
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _copy(model, fields, rows):
+    """Load ``rows`` (tuples in ``fields`` order) with PostgreSQL COPY."""
+    columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+    sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN'
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        for batch in _batches(rows, COPY_BATCH_SIZE):
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                buffer = io.StringIO()
+                # Quoted strings keep '' apart from NULL, which is written as None -> empty.
+                csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(batch)
+                buffer.seek(0)
+                raw.copy_expert(f'{sql} WITH (FORMAT csv)', buffer)
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    for row in batch:
+                        copy.write_row(row)
+
+
+def insert_rows(model, fields, rows, batch_size=5000):
+    """Insert ``rows`` (tuples in ``fields`` order): COPY on PostgreSQL, bulk_create elsewhere."""
+    if connection.vendor == 'postgresql':
+        _copy(model, fields, rows)
+        return
+    for batch in _batches(rows, batch_size):
+        model.objects.bulk_create([model(**dict(zip(fields, row))) for row in batch])
+
+
+def current_counts():
+    return {
+        'officers': Officer.objects.count(),
+        'users': CustomUser.objects.filter(email__endswith=f'@{USER_EMAIL_DOMAIN}').count(),
+        'logs': TimeLog.objects.count(),
+        'items': Item.objects.count(),
+    }
+
+
+def clear():
+    """Delete all officers, logs, items and activity, and the synthetic users."""
+    TapReceipt.objects.all().delete()
+    Activity.objects.all().delete()
+    OfficerDailyHours.objects.all().delete()
+    TimeLog.objects.all().delete()
+    Officer.objects.all().delete()
+    Item.objects.all().delete()
+    CustomUser.objects.filter(email__endswith=f'@{USER_EMAIL_DOMAIN}').delete()
+
+
+def _name(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def _officer_rows(count, rng):
+    rows = []
+    for officer_id in officer_ids(count):
+        first, last = _name(rng)
+        rows.append((officer_id, f'{first} {last}', rng.choice(POSITIONS)))
+    return rows
+
+
+def seed_officers(count, rng, batch_size=5000):
+    insert_rows(Officer, ('id', 'name', 'position'), _officer_rows(count, rng), batch_size)
+
+
+def holds(officers, logs, items, users=0, seed=1):
+    """True if the database already holds what ``seed`` would write.
+
+    Officers are generated first, so the same volumes with the same
+    officers mean the same seed.
+    """
+    if current_counts() != {'officers': officers, 'users': users, 'logs': logs, 'items': items}:
+        return False
+    stored = list(Officer.objects.order_by('id').values_list('id', 'name', 'position'))
+    return stored == _officer_rows(officers, random.Random(seed))
+
+
+def seed_users(count, rng, now, batch_size=5000):
+    """Accounts with unusable passwords, all Officers, some Staff or Executive Officers."""
+    if not count:
+        return
+    password = make_password(None)
+    rows = []
+    for student_number in officer_ids(count):
+        first, last = _name(rng)
+        rows.append((
+            student_number, f'user{student_number}', password, first, last,
+            f'{student_number}@{USER_EMAIL_DOMAIN}', False, False, True,
+            now - timedelta(days=rng.randrange(ITEM_HISTORY_DAYS)),
+        ))
+    insert_rows(CustomUser, (
+        'student_number', 'username', 'password', 'first_name', 'last_name',
+        'email', 'is_superuser', 'is_staff', 'is_active', 'date_joined',
+    ), rows, batch_size)
+
+    user_ids = list(
+        CustomUser.objects.filter(email__endswith=f'@{USER_EMAIL_DOMAIN}').order_by('student_number').values_list('id', flat=True)
+    )
+    officer_group = Group.objects.get_or_create(name='Officer')[0]
+    memberships = [(user_id, officer_group.pk) for user_id in user_ids]
+    for name, share in ROLE_SHARES:
+        group = Group.objects.get_or_create(name=name)[0]
+        memberships.extend((user_id, group.pk) for user_id in user_ids if rng.random() < share)
+    insert_rows(CustomUser.groups.through, ('customuser_id', 'group_id'), memberships, batch_size)
+
+
+def _officer_shifts(ids, rng):
+    weights = [share for start_hour, hours, share in SHIFTS]
+    return {officer_id: rng.choices(SHIFTS, weights=weights)[0] for officer_id in ids}
+
+
+def _day_sessions(day, shift, rng, now):
+    """``[(time_in, time_out or None), ...]`` for one officer on one worked day."""
+    start_hour, hours, share = shift
+    time_in = datetime.combine(day, time(start_hour), tzinfo=dt_timezone.utc)
+    time_in += timedelta(minutes=rng.gauss(0, 15))
+    length = timedelta(hours=hours) + timedelta(minutes=rng.gauss(0, 30))
+    if time_in > now:
+        return []
+    if time_in + length > now:
+        # On shift right now.
+        return [(time_in, None)]
+    if rng.random() < SPLIT_DAY_RATE:
+        first = length * rng.uniform(0.3, 0.6)
+        resume = time_in + first + timedelta(minutes=rng.randrange(30, 61))
+        time_out = resume + (length - first)
+        if time_out <= now:
+            return [(time_in, time_in + first), (resume, time_out)]
+    return [(time_in, time_in + length)]
+
+
+def _officer_days(ids, count, rng, now):
+    """Yield ``(officer_id, date, sessions)`` from today backwards, ``count`` sessions in all."""
+    shifts = _officer_shifts(ids, rng)
+    day = now.date()
+    produced = 0
+    while True:
+        attendance = WEEKEND_ATTENDANCE if day.weekday() >= 5 else WEEKDAY_ATTENDANCE
+        for officer_id in ids:
+            if rng.random() >= attendance:
+                continue
+            sessions = _day_sessions(day, shifts[officer_id], rng, now)[:count - produced]
+            if not sessions:
+                continue
+            yield officer_id, day, sessions
+            produced += len(sessions)
+            if produced == count:
+                return
+        day -= timedelta(days=1)
+
+
+def _seconds(time_in, time_out):
+    return None if time_out is None else max(int((time_out - time_in).total_seconds()), 0)
+
+
+def seed_time_logs(count, rng, now, batch_size=5000, progress=None):
+    """Time logs for the seeded officers, with their rollup rows and activity feed."""
+    ids = officer_ids(Officer.objects.count())
+    if not ids or not count:
+        return
+    written = 0
+    for days in _batches(_officer_days(ids, count, rng, now), batch_size):
+        logs = []
+        rollup = []
+        feed = []
+        for officer_id, day, sessions in days:
+            durations = []
+            for time_in, time_out in sessions:
+                seconds = _seconds(time_in, time_out)
+                logs.append((officer_id, day, time_in, time_out, seconds))
+                feed.append((officer_id, Activity.TIME_IN, time_in, str(day)))
+                if time_out is not None:
+                    feed.append((officer_id, Activity.TIME_OUT, time_out, str(day)))
+                if seconds is not None:
+                    durations.append(seconds)
+            rollup.append((officer_id, day, len(durations), sum(durations), max(durations, default=0)))
+        with transaction.atomic():
+            insert_rows(TimeLog, ('officer_id', 'date', 'time_in', 'time_out', 'duration_seconds'), logs, batch_size)
+            insert_rows(OfficerDailyHours, (
+                'officer_id', 'date', 'session_count', 'total_seconds', 'longest_seconds',
+            ), rollup, batch_size)
+            insert_rows(Activity, ('user_id', 'kind', 'timestamp', 'subject'), feed, batch_size)
+        written += len(logs)
+        if progress:
+            progress(written)
+
+
+def _item_added(item_id, count, now):
+    """Items are spread evenly over the past year, oldest ids first."""
+    days_ago = (count - item_id) * ITEM_HISTORY_DAYS // max(count, 1)
+    return (now - timedelta(days=days_ago)).replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def seed_items(count, rng, now, batch_size=5000):
+    rows = (
+        (
+            item_id,
+            f'{rng.choices(ITEM_NAMES, weights=ITEM_NAME_WEIGHTS)[0]} {item_id}',
+            '',
+            min(int(rng.lognormvariate(2.5, 1.0)), 5000),
+            rng.choices(LOCATIONS, weights=LOCATION_WEIGHTS)[0],
+            _item_added(item_id, count, now),
+        )
+        for item_id in range(1, count + 1)
+    )
+    insert_rows(Item, ('id', 'name', 'description', 'quantity', 'location', 'date_added'), rows, batch_size)
+    if connection.vendor != 'postgresql':
+        # bulk_create lets auto_now_add overwrite date_added, so set it
+        # again, one day at a time.
+        first = 1
+        while first <= count:
+            added = _item_added(first, count, now)
+            last = first
+            while last + 1 <= count and _item_added(last + 1, count, now) == added:
+                last += 1
+            Item.objects.filter(id__gte=first, id__lte=last).update(date_added=added)
+            first = last + 1
+    # Ids were given explicitly; move the sequence past them.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Item]):
+            cursor.execute(sql)
+
+
+def seed(officers, logs, items, users=0, seed=1, batch_size=5000, now=None, progress=None, flush=False):
+    """Fill the database to exactly the requested volumes.
+
+    Existing officers, logs, items and synthetic users are replaced.
+    Unless ``flush`` is set, returns False without writing anything if the
+    database already holds these volumes from the same seed.
+    """
+    if not flush and holds(officers, logs, items, users, seed):
+        return False
+    now = now or timezone.now()
+    rng = random.Random(seed)
+    clear()
+    seed_officers(officers, rng, batch_size)
+    seed_users(users, rng, now, batch_size)
+    seed_time_logs(logs, rng, now, batch_size=batch_size, progress=progress)
+    seed_items(items, rng, now, batch_size)
+    report_cache.invalidate_all('time')
+    report_cache.invalidate_all('inventory')
+    return True
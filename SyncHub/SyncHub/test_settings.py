@@ -0,0 +1,19 @@
+"""Settings for the test suite.
+
+Run with ``python manage.py test --settings=SyncHub.test_settings``. Tests
+use a local SQLite database, and going over a view's query budget fails
+the test instead of only logging a warning.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+PROFILING_FAIL_ON_BUDGET = True
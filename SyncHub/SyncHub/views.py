@@ -1,14 +1,19 @@
 from django.shortcuts import render, redirect
-from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
-from django.contrib.auth.models import Group, User
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate, alogin, logout as auth_logout
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import PasswordResetForm
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.sessions.models import Session
-from django.utils import timezone
+from django.db.models import Max
+from django.utils.crypto import constant_time_compare
+from . import activity, metrics
+from .active_sessions import online_users
 from .forms import CustomUserCreationForm
 from .models import CustomUser
 import json
@@ -28,50 +33,41 @@ def purpose_page(request):
     """Purpose page view"""
     return render(request, 'purpose.html')
 
-def _authenticate_identifier_password(request, identifier, password):
-    """Authenticate by student number or email."""
-    user = None
-    if identifier and password:
-        # Try as student number if it's 7 digits
-        if identifier.isdigit() and len(identifier) == 7:
-            user = authenticate(request, username=identifier, password=password)
-        else:
-            # Try as email
-            try:
-                user_obj = CustomUser.objects.get(email__iexact=identifier)
-                user = authenticate(request, username=user_obj.student_number, password=password)
-            except CustomUser.DoesNotExist:
-                pass
-    return user
-
 @csrf_exempt
-def login_api(request):
+async def login_api(request):
     """JSON API login endpoint."""
     logger.info(f"Login API request: method={request.method}, content_type={request.content_type}, body_length={len(request.body)}")
     if request.method != 'POST':
         logger.warning(f"Invalid method: {request.method}")
+        metrics.logins.inc(result='invalid')
         return JsonResponse({'message': 'Method not allowed.'}, status=405)
     if request.content_type != 'application/json':
         logger.warning(f"Invalid content-type: {request.content_type}")
+        metrics.logins.inc(result='invalid')
         return JsonResponse({'message': 'Content-Type must be application/json.'}, status=400)
     try:
         payload = json.loads(request.body.decode('utf-8'))
-        logger.info(f"Parsed payload: {payload}")
+        # Never log the payload itself; it carries the password.
+        logger.info(f"Parsed payload with keys: {sorted(payload) if isinstance(payload, dict) else type(payload).__name__}")
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error: {e}")
+        metrics.logins.inc(result='invalid')
         return JsonResponse({'message': 'Invalid JSON.'}, status=400)
     except Exception as e:
         logger.error(f"Unexpected error parsing JSON: {e}")
+        metrics.logins.inc(result='invalid')
         return JsonResponse({'message': 'Invalid JSON.'}, status=400)
     identifier = payload.get('identifier') or payload.get('username')
     password = payload.get('password')
     if not identifier or not password:
         logger.warning("Missing identifier or password")
+        metrics.logins.inc(result='invalid')
         return JsonResponse({'message': 'Identifier and password are required.'}, status=400)
-    user = _authenticate_identifier_password(request, identifier, password)
+    user = await aauthenticate(request, username=identifier, password=password)
     if user is not None:
-        auth_login(request, user)
+        await alogin(request, user)
         logger.info(f"Login successful for user: {user.username}")
+        metrics.logins.inc(result='success')
         return JsonResponse({
             'message': 'Login successful.',
             'user': {
@@ -82,10 +78,11 @@ def login_api(request):
             }
         })
     logger.warning(f"Invalid credentials for identifier: {identifier}")
+    metrics.logins.inc(result='failure')
     return JsonResponse({'message': 'Invalid credentials.'}, status=400)
 
 @csrf_exempt
-def signup_api(request):
+async def signup_api(request):
     """Signup API endpoint that accepts JSON POST to create a new user"""
     if request.method != 'POST':
         return JsonResponse({'message': 'Method not allowed.'}, status=405)
@@ -102,25 +99,25 @@ def signup_api(request):
     student_number = payload.get('student_number') or payload.get('username', '').strip()
     if not email or not password or not student_number:
         return JsonResponse({'message': 'Email, password, and student number are required.'}, status=400)
-    if CustomUser.objects.filter(email__iexact=email).exists():
+    if await CustomUser.objects.filter(email__iexact=email).aexists():
         return JsonResponse({'message': 'Email already registered.'}, status=400)
-    if CustomUser.objects.filter(student_number=student_number).exists():
+    if await CustomUser.objects.filter(student_number=student_number).aexists():
         return JsonResponse({'message': 'Student number already registered.'}, status=400)
     if not student_number.isdigit() or len(student_number) != 7:
         return JsonResponse({'message': 'Student number must be exactly 7 digits.'}, status=400)
     try:
-        user = CustomUser.objects.create_user(
+        user = CustomUser(
             username=student_number,
             first_name=first_name,
             last_name=last_name,
-            email=email,
-            password=password,
+            email=CustomUser.objects.normalize_email(email),
             student_number=student_number
         )
-        user.save()
+        user.password = await sync_to_async(make_password, thread_sensitive=False)(password)
+        await user.asave()
         # Assign Officer role to new users
-        officer_group, created = Group.objects.get_or_create(name='Officer')
-        user.groups.add(officer_group)
+        officer_group, created = await Group.objects.aget_or_create(name='Officer')
+        await user.groups.aadd(officer_group)
         logger.info(f"User created successfully: {student_number}")
         return JsonResponse({'message': 'User created successfully.'})
     except Exception as e:
@@ -130,7 +127,7 @@ def signup_api(request):
 @login_required
 def dashboard_view(request):
     """Dashboard view - requires authentication"""
-    is_executive_or_staff = request.user.groups.filter(name='executive officer').exists() or request.user.groups.filter(name='staff').exists()
+    is_executive_or_staff = request.roles.is_executive_or_staff
     context = {
         'is_executive_or_staff': is_executive_or_staff,
     }
@@ -194,76 +191,27 @@ def profile_view(request):
         return JsonResponse({'message': 'Profile updated successfully.'})
 
     # GET render
-    user_groups = request.user.groups.all()
-    if user_groups.filter(name='Executive Officer').exists():
+    roles = request.roles
+    if roles.has('Executive Officer'):
         role = 'Executive Officer'
-    elif user_groups.filter(name='Officer').exists():
+    elif roles.has('Officer'):
         role = 'Officer'
-    elif user_groups.filter(name='Mentee').exists():
+    elif roles.has('Mentee'):
         role = 'Mentee'
     else:
         role = 'Staff'
 
-    # Get recent RFID activities for the user
-    from rfid_login.models import TimeLog, Officer
-    from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
-    from django.contrib.contenttypes.models import ContentType
-    from inventory.models import Item
-    
-    recent_activities = []
-    
-    # Get RFID time log activities
-    try:
-        officer = Officer.objects.get(id=request.user.student_number)
-        logs = TimeLog.objects.filter(officer=officer).order_by('-date', '-time_in')[:10]
-        for log in logs:
-            if log.time_out:
-                activity = {
-                    'text': f"Time Out: {log.date} at {log.time_out.astimezone().strftime('%I:%M %p')}",
-                    'timestamp': log.time_out
-                }
-            else:
-                activity = {
-                    'text': f"Time In: {log.date} at {log.time_in.astimezone().strftime('%I:%M %p')}",
-                    'timestamp': log.time_in
-                }
-            recent_activities.append(activity)
-    except Officer.DoesNotExist:
-        pass
-    
-    # Get inventory management activities from Django admin logs
-    try:
-        item_content_type = ContentType.objects.get_for_model(Item)
-        inventory_logs = LogEntry.objects.filter(
-            user=request.user,
-            content_type=item_content_type
-        ).order_by('-action_time')[:10]
-        
-        for log in inventory_logs:
-            action_text = ""
-            if log.action_flag == ADDITION:
-                action_text = f"Added inventory item: {log.object_repr}"
-            elif log.action_flag == CHANGE:
-                action_text = f"Updated inventory item: {log.object_repr}"
-            elif log.action_flag == DELETION:
-                action_text = f"Deleted inventory item: {log.object_repr}"
-            
-            if action_text:
-                activity = {
-                    'text': action_text,
-                    'timestamp': log.action_time
-                }
-                recent_activities.append(activity)
-    except Exception:
-        pass
-    
-    # Sort all activities by timestamp and take the most recent 10
-    recent_activities.sort(key=lambda x: x['timestamp'], reverse=True)
-    recent_activities = [activity['text'] for activity in recent_activities[:10]]
+    # Recent taps and inventory changes, newest first, from the activity
+    # feed; ``after`` pages to older entries.
+    page_size = getattr(settings, 'PROFILE_ACTIVITY_PAGE_SIZE', 10)
+    after = activity.parse_cursor(request.GET.get('after'))
+    recent_activities, next_cursor = activity.feed_page(request.user, page_size, after)
 
     context = {
         'role': role,
         'recent_activities': recent_activities,
+        'older_url': f"?after={next_cursor}" if next_cursor else None,
+        'is_older_page': after is not None,
     }
     return render(request, 'profile.html', context)
 
@@ -276,15 +224,9 @@ def logout_view(request):
 
 def get_logged_in_superusers():
     """Utility function to get currently logged-in superusers"""
-    sessions = Session.objects.filter(expire_date__gte=timezone.now())
-    user_ids = set()
-    for session in sessions:
-        data = session.get_decoded()
-        user_id = data.get('_auth_user_id')
-        if user_id:
-            user_ids.add(int(user_id))
-    superusers = User.objects.filter(id__in=user_ids, is_superuser=True)
-    return superusers
+    return online_users().filter(is_superuser=True).annotate(
+        last_seen=Max('active_sessions__last_seen'),
+    ).order_by('-last_seen')
 
 @user_passes_test(lambda u: u.is_superuser)
 def logged_in_superadmins_view(request):
@@ -292,18 +234,27 @@ def logged_in_superadmins_view(request):
     superusers = get_logged_in_superusers()
     return render(request, 'logged_in_superadmins.html', {'superusers': superusers})
 
-def auth_status_api(request):
+async def auth_status_api(request):
     """API endpoint to check authentication status."""
-    if request.user.is_authenticated:
+    user = await request.auser()
+    if user.is_authenticated:
         return JsonResponse({
             'authenticated': True,
-            'username': request.user.username,
-            'email': request.user.email,
-            'first_name': request.user.first_name,
-            'last_name': request.user.last_name,
+            'username': user.username,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
         })
     return JsonResponse({'authenticated': False})
 
+def metrics_view(request):
+    """Prometheus scrape endpoint, for superusers or a bearer METRICS_TOKEN."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_superuser or (token and constant_time_compare(authorization, f'Bearer {token}'))):
+        return HttpResponse('Access denied', status=403)
+    return HttpResponse(metrics.render(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def password_reset_validate_email(request):
     """Custom password reset view that sends actual reset link via email"""
     if request.method == 'POST':
@@ -2,6 +2,26 @@
 
 from django.db import migrations
 
+# The identity/sequence statements are PostgreSQL-only; skip them elsewhere
+# so the schema can also be built on SQLite (e.g. for benchmark runs).
+FORWARD_SQL = [
+    "ALTER TABLE inventory_item ALTER COLUMN id DROP IDENTITY IF EXISTS;",
+    "DROP SEQUENCE IF EXISTS inventory_item_id_seq;",
+]
+REVERSE_SQL = [
+    "CREATE SEQUENCE inventory_item_id_seq OWNED BY inventory_item.id;",
+    "ALTER TABLE inventory_item ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;",
+]
+
+
+def _run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
 
 class Migration(migrations.Migration):
 
@@ -10,12 +30,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunSQL(
-            "ALTER TABLE inventory_item ALTER COLUMN id DROP IDENTITY IF EXISTS;",
-            reverse_sql="ALTER TABLE inventory_item ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;"
-        ),
-        migrations.RunSQL(
-            "DROP SEQUENCE IF EXISTS inventory_item_id_seq;",
-            reverse_sql="CREATE SEQUENCE inventory_item_id_seq OWNED BY inventory_item.id;"
-        ),
+        migrations.RunPython(_run_on_postgresql(FORWARD_SQL), _run_on_postgresql(REVERSE_SQL)),
     ]
@@ -0,0 +1,48 @@
+"""Inventory report aggregation, computed entirely in the database."""
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from SyncHub.granularity import AUTO as GRANULARITY_AUTO, label, resolve as resolve_granularity, trunc
+
+from .models import Item
+
+
+def build_inventory_report(start_date=None, end_date=None, granularity=GRANULARITY_AUTO):
+    """Return items added per period and total quantity per item name.
+
+    ``granularity`` is day, week, month or auto (see ``SyncHub.granularity``).
+    """
+    items = Item.objects.all()
+    if start_date:
+        items = items.filter(date_added__date__gte=start_date)
+    if end_date:
+        items = items.filter(date_added__date__lte=end_date)
+
+    first, last = start_date, end_date
+    if granularity == GRANULARITY_AUTO and not (first and last):
+        bounds = items.aggregate(first=Min('date_added'), last=Max('date_added'))
+        first = first or (bounds['first'] and timezone.localdate(bounds['first']))
+        last = last or (bounds['last'] and timezone.localdate(bounds['last']))
+    resolved = resolve_granularity(granularity, first, last)
+
+    items_by_date = list(items.values(period=trunc(resolved, 'date_added')).annotate(
+        total_items=Count('id'),
+        total_quantity=Sum('quantity')
+    ).order_by('period'))
+
+    item_quantities = list(
+        items.values('name').annotate(total_quantity=Sum('quantity'))
+        .order_by('-total_quantity', 'name').values_list('name', 'total_quantity')
+    )
+
+    return {
+        'items_by_date': items_by_date,
+        'granularity': resolved,
+        'item_quantities': item_quantities,
+        'dates': [label(resolved, item['period']) for item in items_by_date],
+        'items_count': [item['total_items'] for item in items_by_date],
+        'total_quantities_list': [item['total_quantity'] or 0 for item in items_by_date],
+        'item_names': [name for name, qty in item_quantities],
+        'item_total_quantities': [qty for name, qty in item_quantities],
+        'filters': {'start_date': start_date, 'end_date': end_date, 'granularity': granularity},
+    }
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from SyncHub import report_cache
+from .models import Item
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_inventory_reports(sender, instance, **kwargs):
+    if instance.date_added:
+        report_cache.invalidate('inventory', [timezone.localdate(instance.date_added)])
@@ -1,3 +1,35 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from SyncHub.models import CustomUser
+from .models import Item
+
+
+class InventoryReportETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(CustomUser.objects.create_superuser(
+            student_number='9000001', username='admin', password='pw',
+            email='admin@example.com', first_name='Ad', last_name='Min',
+        ))
+        self.url = reverse('inventory:inventory_reports_data')
+
+    def test_not_modified_until_an_item_changes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(name='Projector', quantity=2)
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleting_an_item_changes_the_etag(self):
+        item = Item.objects.create(name='Projector', quantity=2)
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 200)
@@ -6,5 +6,6 @@ app_name = 'inventory'
 urlpatterns = [
     path('', views.item_list, name='item_list'),
     path('reports/', views.inventory_reports_view, name='inventory_reports'),
+    path('reports/data/', views.inventory_reports_data, name='inventory_reports_data'),
     # Note: Add, edit, and delete URLs removed as per user request to consolidate to one HTML template
 ]
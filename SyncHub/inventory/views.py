@@ -3,73 +3,69 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import Group
 from django.http import JsonResponse
-from django.db.models import Count, Sum
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
 from django.contrib.contenttypes.models import ContentType
+from SyncHub import activity, granularity as granularity_choices, report_cache
+from SyncHub.models import Activity
+from SyncHub.roles import roles_for
 from .models import Item
 from .forms import ItemForm
+from .reports import build_inventory_report
 
 def superadmin_required(view_func):
-    return user_passes_test(lambda u: u.is_superuser or u.groups.filter(name__in=['Executive Officer', 'Staff']).exists())(view_func)
+    return user_passes_test(lambda u: roles_for(u).is_admin)(view_func)
+
+def get_inventory_report_data(request):
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    granularity = granularity_choices.normalize(request.GET.get('granularity'))
+    return report_cache.get_or_compute(
+        'inventory', start_date, end_date,
+        lambda: build_inventory_report(start_date, end_date, granularity),
+        variant='' if granularity == granularity_choices.AUTO else granularity,
+    )
 
 @login_required
 def inventory_reports_view(request):
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+    is_admin = request.roles.is_admin
     if not is_admin:
         return render(request, 'inventory/inventory_reports.html', {'error': 'Access denied. Admin privileges required.', 'is_admin': is_admin})
 
-    # Get filter parameters from GET request
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-
-    # Base queryset for items_by_date
-    items_by_date = Item.objects.values('date_added__date').annotate(
-        total_items=Count('id'),
-        total_quantity=Sum('quantity')
-    )
-
-    # Apply filters
-    if start_date:
-        items_by_date = items_by_date.filter(date_added__date__gte=start_date)
-    if end_date:
-        items_by_date = items_by_date.filter(date_added__date__lte=end_date)
-
-    items_by_date = items_by_date.order_by('date_added__date')
-
-    # Second aggregation: Total quantity per item for filtered dates
-    filtered_items = Item.objects.filter()
-    if start_date:
-        filtered_items = filtered_items.filter(date_added__date__gte=start_date)
-    if end_date:
-        filtered_items = filtered_items.filter(date_added__date__lte=end_date)
-
-    item_quantities = {}
-    for item in filtered_items:
-        name = item.name
-        item_quantities[name] = item_quantities.get(name, 0) + item.quantity
-
-    # Sort by total quantity descending
-    sorted_items = sorted(item_quantities.items(), key=lambda x: x[1], reverse=True)
-    item_names = [name for name, qty in sorted_items]
-    item_total_quantities = [qty for name, qty in sorted_items]
-
-    # Prepare data for first chart (items added by date)
-    dates = [item['date_added__date'].strftime('%b %d') for item in items_by_date]
-    items_count = [item['total_items'] for item in items_by_date]
-    total_quantities_list = [item['total_quantity'] or 0 for item in items_by_date]
+    data = get_inventory_report_data(request)
 
+    # Charts fetch their data from inventory_reports_data.
     return render(request, 'inventory/inventory_reports.html', {
-        'items_by_date': items_by_date,
-        'item_quantities': sorted_items,
-        'dates': json.dumps(dates),
-        'items_count': json.dumps(items_count),
-        'total_quantities_list': json.dumps(total_quantities_list),
-        'item_names': json.dumps(item_names),
-        'item_total_quantities': json.dumps(item_total_quantities),
+        'items_by_date': data['items_by_date'],
+        'item_quantities': data['item_quantities'],
+        'granularity': data['granularity'],
+        'granularity_choices': granularity_choices.CHOICES,
         'is_admin': is_admin,
-        'filters': {'start_date': start_date, 'end_date': end_date}
+        'filters': data['filters']
     })
 
+def _inventory_report_etag(request):
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return None
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    granularity = granularity_choices.normalize(request.GET.get('granularity'))
+    return report_cache.etag('inventory', start_date, end_date, granularity)
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_inventory_report_etag)
+def inventory_reports_data(request):
+    """Chart data of the inventory reports page as JSON."""
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+
+    data = get_inventory_report_data(request)
+    return JsonResponse(data)
+
 @login_required
 def item_list(request):
     if request.method == 'POST':
@@ -101,6 +97,7 @@ def item_list(request):
                         action_flag=CHANGE,
                         change_message='Updated item'
                     )
+                    activity.item_activity(request.user, item, Activity.ITEM_UPDATED).save()
                     
                     return JsonResponse({'success': True})
                 except Item.DoesNotExist:
@@ -121,6 +118,9 @@ def item_list(request):
                         action_flag=DELETION,
                         change_message='Deleted item'
                     )
+                Activity.objects.bulk_create([
+                    activity.item_activity(request.user, item, Activity.ITEM_DELETED) for item in items_to_delete
+                ])
                 
                 deleted_count = items_to_delete.delete()[0]
                 return JsonResponse({'success': True, 'deleted_count': deleted_count, 'item_ids': item_ids})
@@ -148,6 +148,7 @@ def item_list(request):
                         action_flag=ADDITION,
                         change_message='Created item'
                     )
+                    activity.item_activity(request.user, item, Activity.ITEM_ADDED).save()
                     
                     return JsonResponse({'success': True})
                 except ValueError:
@@ -158,6 +159,7 @@ def item_list(request):
             elif action == 'save':
                 items_data = data.get('items', [])
                 new_items_data = data.get('new_items', [])
+                feed = []
 
                 # Update existing items
                 for item_data in items_data:
@@ -179,6 +181,7 @@ def item_list(request):
                                 action_flag=CHANGE,
                                 change_message='Updated item'
                             )
+                            feed.append(activity.item_activity(request.user, item, Activity.ITEM_UPDATED))
                         except Item.DoesNotExist:
                             # If item doesn't exist, create it
                             item = Item.objects.create(
@@ -197,6 +200,7 @@ def item_list(request):
                                 action_flag=ADDITION,
                                 change_message='Created item'
                             )
+                            feed.append(activity.item_activity(request.user, item, Activity.ITEM_ADDED))
 
                 # Create new items
                 for new_item_data in new_items_data:
@@ -217,12 +221,14 @@ def item_list(request):
                             action_flag=ADDITION,
                             change_message='Created item'
                         )
+                        feed.append(activity.item_activity(request.user, item, Activity.ITEM_ADDED))
 
+                Activity.objects.bulk_create(feed)
                 return JsonResponse({'success': True})
 
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
 
     items = Item.objects.all()
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+    is_admin = request.roles.is_admin
     return render(request, 'inventory/inventory.html', {'items': items, 'is_admin': is_admin})
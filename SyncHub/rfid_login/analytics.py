@@ -0,0 +1,197 @@
+"""Attendance analytics for the time reports page.
+
+Time logs in the range are loaded once as columnar NumPy arrays (officer
+index, day number, session seconds) and every metric is computed with
+vectorized operations, so the cost is one query plus array work linear in
+the number of logs.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .models import Officer, TimeLog
+
+PERCENTILES = (50, 90, 99)
+ROLLING_WINDOWS = (7, 30)
+# Longest daily series the rolling chart gets; longer ranges show their last year.
+ROLLING_MAX_DAYS = 366
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+HISTOGRAM_BINS = 10
+TOP_STREAKS = 10
+
+_EPOCH = date(1970, 1, 1)
+
+
+def load_sessions(start_date=None, end_date=None):
+    """Return ``(officer_ids, officer_index, days, seconds)`` for the range.
+
+    ``days`` counts days since 1970-01-01 and ``seconds`` is NaN for logs
+    that are still open.
+    """
+    logs = TimeLog.objects.all()
+    if start_date:
+        logs = logs.filter(date__gte=start_date)
+    if end_date:
+        logs = logs.filter(date__lte=end_date)
+    rows = list(logs.values_list('officer_id', 'date', 'duration_seconds').iterator(chunk_size=10000))
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return np.array([], dtype=object), empty, empty, np.array([], dtype=float)
+
+    officers, dates, durations = zip(*rows)
+    officer_ids, officer_index = np.unique(np.array(officers, dtype=object), return_inverse=True)
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+    seconds = np.array([np.nan if value is None else value for value in durations], dtype=float)
+    return officer_ids, officer_index, days, seconds
+
+
+def _today():
+    # Logs are dated by the UTC day of the tap.
+    return np.datetime64(timezone.now().date(), 'D').astype(np.int64)
+
+
+def _to_date(day):
+    return _EPOCH + timedelta(days=int(day))
+
+
+def _percentiles(values):
+    if not values.size:
+        return {f'p{p}': 0 for p in PERCENTILES}
+    points = np.percentile(values, PERCENTILES)
+    return {f'p{p}': round(float(point), 2) for p, point in zip(PERCENTILES, points)}
+
+
+def _distribution(values):
+    """Summary statistics and a histogram for an array of hours."""
+    summary = {
+        'count': int(values.size),
+        'mean': round(float(values.mean()), 2) if values.size else 0,
+        'max': round(float(values.max()), 2) if values.size else 0,
+        **_percentiles(values),
+    }
+    if values.size:
+        counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+        summary['histogram'] = {
+            'counts': counts.tolist(),
+            'edges': [round(float(edge), 2) for edge in edges],
+        }
+    else:
+        summary['histogram'] = {'counts': [], 'edges': []}
+    return summary
+
+
+def _weekday_pattern(officer_index, days, seconds, closed):
+    # 1970-01-01 was a Thursday; shift so Monday is 0.
+    weekdays = (days + 3) % 7
+    hours = np.bincount(weekdays[closed], weights=seconds[closed], minlength=7) / 3600
+    sessions = np.bincount(weekdays[closed], minlength=7)
+
+    # Distinct officer-days present on each weekday, and how many calendar
+    # days of that weekday had anyone present.
+    officer_days = np.unique(np.stack([officer_index, days]), axis=1)
+    attendance = np.bincount((officer_days[1] + 3) % 7, minlength=7)
+    unique_days = np.unique(days)
+    active_days = np.bincount((unique_days + 3) % 7, minlength=7)
+
+    pattern = []
+    for weekday in range(7):
+        pattern.append({
+            'weekday': WEEKDAYS[weekday],
+            'total_hours': round(float(hours[weekday]), 2),
+            'sessions': int(sessions[weekday]),
+            'officer_days': int(attendance[weekday]),
+            'average_officers': round(float(attendance[weekday] / active_days[weekday]), 2) if active_days[weekday] else 0,
+            'average_hours_per_officer_day': round(float(hours[weekday] / attendance[weekday]), 2) if attendance[weekday] else 0,
+        })
+    return pattern
+
+
+def _streaks(officer_ids, officer_index, days, last_day):
+    """Longest and current runs of consecutive attended days per officer."""
+    if not days.size:
+        return []
+    # One entry per officer-day, sorted by officer then day.
+    pairs = np.unique(np.stack([officer_index, days]), axis=1)
+    officers, officer_days = pairs[0], pairs[1]
+
+    # A new run starts at the first entry and wherever the officer changes
+    # or the previous day is missing.
+    starts = np.ones(officers.size, dtype=bool)
+    starts[1:] = (officers[1:] != officers[:-1]) | (officer_days[1:] - officer_days[:-1] != 1)
+    start_positions = np.flatnonzero(starts)
+    lengths = np.diff(np.append(start_positions, officers.size))
+    run_officers = officers[start_positions]
+    run_ends = officer_days[np.append(start_positions[1:], officers.size) - 1]
+
+    longest = np.zeros(officer_ids.size, dtype=np.int64)
+    np.maximum.at(longest, run_officers, lengths)
+    current = np.zeros(officer_ids.size, dtype=np.int64)
+    ongoing = run_ends == last_day
+    current[run_officers[ongoing]] = lengths[ongoing]
+
+    order = np.lexsort((officer_ids.astype(str), -current, -longest))[:TOP_STREAKS]
+    names = dict(Officer.objects.filter(pk__in=officer_ids[order].tolist()).values_list('pk', 'name'))
+    return [
+        {
+            'officer_id': officer_ids[i],
+            'officer_name': names.get(officer_ids[i], officer_ids[i]),
+            'longest_streak': int(longest[i]),
+            'current_streak': int(current[i]),
+        }
+        for i in order
+    ]
+
+
+def _rolling_hours(days, seconds, closed, first_day, last_day):
+    """Daily closed hours with trailing rolling averages over the range.
+
+    At most the last ``ROLLING_MAX_DAYS`` days are returned.
+    """
+    shown_from = max(first_day, last_day - ROLLING_MAX_DAYS + 1)
+    # The days just before the shown part still count towards its averages.
+    first_day = max(first_day, shown_from - max(ROLLING_WINDOWS) + 1)
+    span = int(last_day - first_day) + 1
+    counted = closed & (days >= first_day) & (days <= last_day)
+    daily = np.bincount((days[counted] - first_day), weights=seconds[counted], minlength=span)[:span] / 3600
+    cumulative = np.concatenate([[0.0], np.cumsum(daily)])
+    positions = np.arange(1, span + 1)
+    offset = int(shown_from - first_day)
+    series = {
+        'dates': [_to_date(day).isoformat() for day in range(int(shown_from), int(last_day) + 1)],
+        'daily_hours': np.round(daily[offset:], 2).tolist(),
+    }
+    for window in ROLLING_WINDOWS:
+        # Windows at the start of the range average over the days available.
+        lower = np.maximum(positions - window, 0)
+        averages = (cumulative[positions] - cumulative[lower]) / (positions - lower)
+        series[f'avg_{window}'] = np.round(averages[offset:], 2).tolist()
+    return series
+
+
+def build_attendance_analytics(start_date=None, end_date=None):
+    """Return distribution, weekday, streak and rolling metrics as plain data."""
+    officer_ids, officer_index, days, seconds = load_sessions(start_date, end_date)
+    closed = ~np.isnan(seconds)
+
+    if days.size:
+        first_day = np.datetime64(start_date, 'D').astype(np.int64) if start_date else days.min()
+        last_day = np.datetime64(end_date, 'D').astype(np.int64) if end_date else days.max()
+    else:
+        first_day = last_day = None
+
+    officer_hours = np.bincount(officer_index[closed], weights=seconds[closed], minlength=officer_ids.size) / 3600
+    officer_hours = officer_hours[np.bincount(officer_index[closed], minlength=officer_ids.size) > 0]
+
+    return {
+        'officer_hours': _distribution(officer_hours),
+        'session_hours': _distribution(seconds[closed] / 3600),
+        'weekdays': _weekday_pattern(officer_index, days, seconds, closed),
+        # A range ending in the future can't have taps there yet; current
+        # streaks run up to today.
+        'streaks': _streaks(officer_ids, officer_index, days, min(last_day, _today())) if days.size else [],
+        'rolling': _rolling_hours(days, seconds, closed, first_day, last_day) if days.size else {
+            'dates': [], 'daily_hours': [], **{f'avg_{window}': [] for window in ROLLING_WINDOWS}
+        },
+        'filters': {'start_date': start_date, 'end_date': end_date},
+    }
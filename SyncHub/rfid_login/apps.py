@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RfidLoginConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rfid_login'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,54 @@
+"""Drops repeat scans of the same card before they reach the database.
+
+Readers often deliver one physical tap two or three times within a second.
+Recently accepted taps are kept in a fixed-size ring buffer, so the
+check is O(1) with bounded memory. This is per process; across workers,
+``rfid_login.taps.record_tap`` checks the same window against the officer's
+latest log inside its locked transaction.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+class RecentTaps:
+    def __init__(self, window=2.0, capacity=1024):
+        self.window = window
+        self._slots = [None] * capacity
+        self._next = 0
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, officer_id, now=None):
+        """Return True if the ID was accepted within the window, else record it.
+
+        Duplicates don't refresh the timestamp, so holding a card on the
+        reader can't keep it blocked indefinitely.
+        """
+        if self.window <= 0:
+            return False
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last_seen = self._latest.get(officer_id)
+            if last_seen is not None and now - last_seen < self.window:
+                return True
+            evicted = self._slots[self._next]
+            if evicted is not None and self._latest.get(evicted[0]) == evicted[1]:
+                del self._latest[evicted[0]]
+            self._slots[self._next] = (officer_id, now)
+            self._next = (self._next + 1) % len(self._slots)
+            self._latest[officer_id] = now
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._slots = [None] * len(self._slots)
+            self._next = 0
+            self._latest.clear()
+
+
+recent_taps = RecentTaps(
+    window=getattr(settings, 'RFID_TAP_DEBOUNCE_SECONDS', 2.0),
+    capacity=getattr(settings, 'RFID_TAP_DEBOUNCE_BUFFER', 1024),
+)
@@ -0,0 +1,166 @@
+"""Live time-in/time-out events for the time log page.
+
+Events are published after the tap's transaction commits and fanned out to
+Server-Sent Events subscribers. ``InProcessBroadcaster`` only reaches
+subscribers in the same process, which is enough for tests and a single
+worker. ``PostgresNotifyBroadcaster`` relays events through LISTEN/NOTIFY so
+every worker sees every tap. Pick one with ``RFID_EVENT_BACKEND``.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessBroadcaster:
+    queue_size = 100
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        """Deliver an event to subscribers. Safe to call from any thread."""
+        self._deliver(event)
+
+    def _deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down.
+                pass
+
+    @staticmethod
+    def _put(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client; drop rather than buffer without bound.
+            pass
+
+    @asynccontextmanager
+    async def subscribe(self):
+        """Yield an asyncio.Queue that receives published events."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+class PostgresNotifyBroadcaster(InProcessBroadcaster):
+    """Relays events between worker processes with PostgreSQL LISTEN/NOTIFY.
+
+    Each process keeps one extra database connection open, in a background
+    thread, for as long as it has subscribers.
+    """
+    channel = 'rfid_time_log'
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps(event)])
+
+    @asynccontextmanager
+    async def subscribe(self):
+        async with super().subscribe() as queue:
+            self._ensure_listener()
+            yield queue
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='rfid-event-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        db = connections['default']
+        raw = db.get_new_connection(db.get_connection_params())
+        raw.autocommit = True
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._listener = None
+                        break
+                for payload in self._wait_for_notifies(raw, timeout=5):
+                    try:
+                        self._deliver(json.loads(payload))
+                    except ValueError:
+                        logger.warning("Ignoring malformed time log event: %r", payload)
+        except Exception:
+            logger.exception("Time log event listener stopped")
+        finally:
+            raw.close()
+
+    @staticmethod
+    def _wait_for_notifies(raw, timeout):
+        if hasattr(raw, 'notifies') and callable(raw.notifies):
+            # psycopg 3
+            return [notify.payload for notify in raw.notifies(timeout=timeout, stop_after=100)]
+        # psycopg2
+        if select.select([raw], [], [], timeout) == ([], [], []):
+            return []
+        raw.poll()
+        payloads = [notify.payload for notify in raw.notifies]
+        raw.notifies.clear()
+        return payloads
+
+
+_backend = None
+
+
+def get_event_backend():
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'RFID_EVENT_BACKEND', 'rfid_login.events.InProcessBroadcaster')
+        _backend = import_string(backend_path)()
+    return _backend
+
+
+def time_log_event(direction, log, officer):
+    return {
+        'type': f'time_{direction}',
+        'log_id': log.pk,
+        'officer_id': officer.pk,
+        'officer_name': officer.name,
+        'date': log.date.isoformat(),
+        'time_in': log.time_in.isoformat() if log.time_in else None,
+        'time_out': log.time_out.isoformat() if log.time_out else None,
+        'total_hours': log.total_hours,
+    }
+
+
+def publish_on_commit(event):
+    """Publish once the surrounding transaction commits.
+
+    Listeners never see a tap that was rolled back.
+    """
+    transaction.on_commit(lambda: _publish(event))
+
+
+def _publish(event):
+    try:
+        get_event_backend().publish(event)
+    except Exception:
+        # Live updates are best-effort; never fail the tap because of them.
+        logger.exception("Failed to publish time log event")
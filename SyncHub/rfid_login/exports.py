@@ -0,0 +1,101 @@
+"""Renderers for the time report downloads.
+
+Shared by the export views and the background report worker so both produce
+identical files from the same report dictionary.
+"""
+import csv
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+def write_summary_csv(data, file):
+    """Write the per-officer hours summary to a text file object."""
+    writer = csv.writer(file)
+    writer.writerow(['Officer Name', 'Total Hours'])
+
+    for name, hours in data['officer_hours']:
+        writer.writerow([name, round(hours, 2)])
+
+
+def render_pdf(data):
+    """Return the time report as PDF bytes."""
+    # Create PDF buffer
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        textColor=colors.Color(0, 123/255, 255/255),  # Blue color matching website
+    )
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=colors.Color(102/255, 126/255, 234/255),  # Purple gradient start color
+    )
+
+    # Title
+    elements.append(Paragraph("Time Reports Summary", title_style))
+    elements.append(Spacer(1, 12))
+
+    # Filters info
+    filters = data['filters']
+    filter_text = f"Date Range: {filters['start_date'] or 'All'} to {filters['end_date'] or 'All'}"
+    elements.append(Paragraph(filter_text, styles['Normal']))
+    elements.append(Spacer(1, 12))
+
+    # Summary metrics
+    elements.append(Paragraph("Summary Metrics", heading_style))
+    metrics_data = [
+        ["Total Officers", str(data['total_officers'])],
+        ["Total Days Covered", str(data['total_days_covered'])],
+        ["Most Active Officer", data['most_active_officer']],
+        ["Most Active Date", data['most_active_date']],
+        ["Highest Single Day Hours", f"{data['highest_single_day_hours']} hours"],
+        ["Average Hours per Officer", f"{data['average_hours_per_officer']:.2f} hours"],
+    ]
+    metrics_table = Table(metrics_data, colWidths=[2*inch, 3*inch])
+    metrics_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(102/255, 126/255, 234/255)),  # Purple gradient start color
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.Color(0, 123/255, 255/255, 0.1)),  # Light blue background for rows
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(metrics_table)
+    elements.append(Spacer(1, 20))
+
+    # Officer Hours Table
+    elements.append(Paragraph("Officer Hours Summary", heading_style))
+    officer_data = [['Officer Name', 'Total Hours']] + [[name, f"{hours:.2f}"] for name, hours in data['officer_hours']]
+    officer_table = Table(officer_data, colWidths=[3*inch, 2*inch])
+    officer_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(102/255, 126/255, 234/255)),  # Purple gradient start color
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.Color(0, 123/255, 255/255, 0.1)),  # Light blue background for rows
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(officer_table)
+
+    # Build PDF
+    doc.build(elements)
+    return buffer.getvalue()
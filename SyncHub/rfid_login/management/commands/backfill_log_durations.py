@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from rfid_login.models import TimeLog
+
+
+class Command(BaseCommand):
+    help = "Fill in TimeLog.duration_seconds for closed logs that don't have it."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Recompute every log's duration, not only missing ones.",
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        logs = TimeLog.objects.order_by('pk')
+        if not options['all']:
+            logs = logs.filter(time_in__isnull=False, time_out__isnull=False, duration_seconds__isnull=True)
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(logs.filter(pk__gt=last_pk).only('time_in', 'time_out', 'duration_seconds')[:batch_size])
+            if not batch:
+                break
+            for log in batch:
+                log.set_duration()
+            TimeLog.objects.bulk_update(batch, ['duration_seconds'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} time logs."))
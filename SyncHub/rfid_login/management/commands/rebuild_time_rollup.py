@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from SyncHub import report_cache
+from rfid_login.models import OfficerDailyHours, TimeLog
+from rfid_login.rollup import compute_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-officer daily hours rollup from TimeLog and verify it."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only compare the stored rollup with TimeLog; don't rebuild.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with transaction.atomic():
+                OfficerDailyHours.objects.all().delete()
+                totals = compute_rollup(self._logs())
+                OfficerDailyHours.objects.bulk_create([
+                    OfficerDailyHours(
+                        officer_id=officer_id, date=date,
+                        session_count=count, total_seconds=total, longest_seconds=longest,
+                    )
+                    for (officer_id, date), (count, total, longest) in totals.items()
+                ], batch_size=1000)
+                report_cache.invalidate_all('time')
+            self.stdout.write(f"Rebuilt {len(totals)} rollup rows.")
+
+        mismatches = self._verify()
+        if mismatches:
+            for key, expected, stored in mismatches[:20]:
+                self.stderr.write(f"{key[0]} {key[1]}: expected {expected}, stored {stored}")
+            raise CommandError(f"Rollup verification failed: {len(mismatches)} mismatched rows.")
+        self.stdout.write(self.style.SUCCESS("Rollup matches TimeLog."))
+
+    def _logs(self):
+        return TimeLog.objects.values_list('officer_id', 'date', 'duration_seconds').iterator(chunk_size=5000)
+
+    def _verify(self):
+        expected = compute_rollup(self._logs())
+        stored = {
+            (officer_id, date): [count, total, longest]
+            for officer_id, date, count, total, longest in OfficerDailyHours.objects.values_list(
+                'officer_id', 'date', 'session_count', 'total_seconds', 'longest_seconds'
+            ).iterator(chunk_size=5000)
+        }
+        mismatches = []
+        for key in expected.keys() | stored.keys():
+            if expected.get(key) != stored.get(key):
+                mismatches.append((key, expected.get(key), stored.get(key)))
+        return sorted(mismatches, key=lambda item: (str(item[0][1]), item[0][0]))
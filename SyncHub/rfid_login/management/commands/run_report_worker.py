@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from rfid_login.report_jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Render queued time report exports in the background."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Process every queued job, then exit instead of polling.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Seconds to wait between checks when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+            job = run_job(job)
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(f"Rendered {job}: {job.artifact}")
+            else:
+                self.stderr.write(f"Failed {job}: {job.error}")
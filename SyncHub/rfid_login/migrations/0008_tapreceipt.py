@@ -0,0 +1,23 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfid_login', '0007_auto_20251112_0423'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TapReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, unique=True)),
+                ('device_id', models.CharField(blank=True, max_length=64)),
+                ('scanned_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('officer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rfid_login.officer')),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def close_duplicate_open_logs(apps, schema_editor):
+    """Keep the earliest open log per officer and day; close the rest at zero length.
+
+    Without this, existing duplicates would block the unique constraint below.
+    """
+    TimeLog = apps.get_model('rfid_login', 'TimeLog')
+    duplicates = (
+        TimeLog.objects.filter(time_out__isnull=True)
+        .values('officer_id', 'date')
+        .annotate(open_count=Count('id'))
+        .filter(open_count__gt=1)
+    )
+    for group in duplicates:
+        open_logs = TimeLog.objects.filter(
+            officer_id=group['officer_id'], date=group['date'], time_out__isnull=True
+        ).order_by('time_in', 'id')
+        for log in list(open_logs)[1:]:
+            log.time_out = log.time_in
+            log.save(update_fields=['time_out'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfid_login', '0008_tapreceipt'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_logs, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(fields=['officer', '-date', '-time_in'], name='timelog_officer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(fields=['date'], name='timelog_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelog',
+            constraint=models.UniqueConstraint(condition=models.Q(('time_out__isnull', True)), fields=('officer', 'date'), name='timelog_one_open_per_officer_day'),
+        ),
+    ]
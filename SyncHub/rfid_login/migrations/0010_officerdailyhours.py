@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_rollup(apps, schema_editor):
+    TimeLog = apps.get_model('rfid_login', 'TimeLog')
+    OfficerDailyHours = apps.get_model('rfid_login', 'OfficerDailyHours')
+    totals = {}
+    logs = TimeLog.objects.values_list('officer_id', 'date', 'time_in', 'time_out').iterator(chunk_size=5000)
+    for officer_id, date, time_in, time_out in logs:
+        row = totals.setdefault((officer_id, date), [0, 0, 0])
+        if time_in and time_out:
+            seconds = max(int((time_out - time_in).total_seconds()), 0)
+            row[0] += 1
+            row[1] += seconds
+            row[2] = max(row[2], seconds)
+    OfficerDailyHours.objects.bulk_create([
+        OfficerDailyHours(officer_id=officer_id, date=date, session_count=count, total_seconds=total, longest_seconds=longest)
+        for (officer_id, date), (count, total, longest) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfid_login', '0009_timelog_indexes_open_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfficerDailyHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('total_seconds', models.PositiveBigIntegerField(default=0)),
+                ('longest_seconds', models.PositiveIntegerField(default=0)),
+                ('officer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rfid_login.officer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='officerdailyhours_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('officer', 'date'), name='officerdailyhours_officer_date')],
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
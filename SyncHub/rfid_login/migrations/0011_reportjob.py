@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfid_login', '0010_officerdailyhours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('pdf', 'PDF report'), ('csv', 'Summary CSV')], max_length=8)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('data_version', models.CharField(max_length=32)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('artifact', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('requested_by', models.CharField(blank=True, max_length=150)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'), models.Index(fields=['format', 'start_date', 'end_date', 'data_version'], name='reportjob_lookup_idx')],
+            },
+        ),
+    ]
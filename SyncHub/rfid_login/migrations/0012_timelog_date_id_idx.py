@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfid_login', '0011_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(fields=['date', 'id'], name='timelog_date_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='timelog',
+            name='timelog_date_idx',
+        ),
+    ]
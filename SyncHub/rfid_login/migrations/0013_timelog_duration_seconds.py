@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+def backfill_durations(apps, schema_editor):
+    TimeLog = apps.get_model('rfid_login', 'TimeLog')
+    logs = TimeLog.objects.filter(time_in__isnull=False, time_out__isnull=False).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(logs.filter(pk__gt=last_pk).only('time_in', 'time_out')[:2000])
+        if not batch:
+            break
+        for log in batch:
+            log.duration_seconds = max(int((log.time_out - log.time_in).total_seconds()), 0)
+        TimeLog.objects.bulk_update(batch, ['duration_seconds'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfid_login', '0012_timelog_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelog',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_durations, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(fields=['date', 'officer', 'duration_seconds'], name='timelog_date_officer_dur_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(condition=models.Q(('duration_seconds__isnull', False)), fields=['-duration_seconds'], name='timelog_longest_idx'),
+        ),
+    ]
@@ -14,11 +14,159 @@ class Officer(models.Model):
     def __str__(self):
         return self.name
 
+def session_seconds(time_in, time_out):
+    """Whole seconds of a closed session, never negative."""
+    return max(int((time_out - time_in).total_seconds()), 0)
+
 class TimeLog(models.Model):
     officer = models.ForeignKey(Officer, on_delete=models.CASCADE)
     time_in = models.DateTimeField(null=True, blank=True)
     time_out = models.DateTimeField(null=True, blank=True)
     date = models.DateField()
+    # Length of the closed session, kept in step with time_in/time_out by
+    # save() so reports can SUM/MAX it instead of subtracting timestamps.
+    # Backfill with ``manage.py backfill_log_durations``.
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Latest logs per officer (kiosk "last log").
+            models.Index(fields=['officer', '-date', '-time_in'], name='timelog_officer_recent_idx'),
+            # Date range filters, and the time log listing's keyset pagination
+            # on (date, id).
+            models.Index(fields=['date', 'id'], name='timelog_date_id_idx'),
+            # Index-only per-officer sums over a date range.
+            models.Index(fields=['date', 'officer', 'duration_seconds'], name='timelog_date_officer_dur_idx'),
+            # Longest sessions first, for top-N queries.
+            models.Index(
+                fields=['-duration_seconds'],
+                condition=models.Q(duration_seconds__isnull=False),
+                name='timelog_longest_idx',
+            ),
+        ]
+        constraints = [
+            # One open session per officer per day. Also serves as the partial
+            # index for the open-log probe on every tap.
+            models.UniqueConstraint(
+                fields=['officer', 'date'],
+                condition=models.Q(time_out__isnull=True),
+                name='timelog_one_open_per_officer_day',
+            ),
+        ]
+
+    # Set by the live tap path, which updates the daily hours rollup itself;
+    # other saves recompute the officer's day (see rfid_login.signals).
+    rollup_applied = False
 
     def __str__(self):
         return f"{self.officer.name} - {self.date}"
+
+    def set_duration(self):
+        if self.time_in and self.time_out:
+            self.duration_seconds = session_seconds(self.time_in, self.time_out)
+        else:
+            self.duration_seconds = None
+
+    def save(self, *args, **kwargs):
+        self.set_duration()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'time_in', 'time_out'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'duration_seconds'}
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Handled here rather than in a post_delete receiver: any receiver
+        # makes deleting an officer load and delete their logs one by one.
+        # Cascades are covered by the officer's own receivers, and the
+        # rollup rows cascade with it.
+        from SyncHub import report_cache
+        from . import rollup
+
+        result = super().delete(*args, **kwargs)
+        rollup.refresh(self.officer_id, self.date)
+        report_cache.invalidate('time', [self.date])
+        return result
+
+    @property
+    def total_hours(self):
+        if self.duration_seconds is None:
+            return None
+        return round(self.duration_seconds / 3600, 2)
+
+class TapReceipt(models.Model):
+    """Idempotency record for a tap uploaded by a buffered reader."""
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    device_id = models.CharField(max_length=64, blank=True)
+    officer = models.ForeignKey(Officer, on_delete=models.CASCADE)
+    scanned_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.idempotency_key} - {self.officer_id}"
+
+class OfficerDailyHours(models.Model):
+    """Per-officer, per-day attendance rollup, kept current as taps happen.
+
+    A row exists for every officer with a log on that date; the totals only
+    count closed sessions. Rebuild with ``manage.py rebuild_time_rollup``.
+    """
+    officer = models.ForeignKey(Officer, on_delete=models.CASCADE)
+    date = models.DateField()
+    session_count = models.PositiveIntegerField(default=0)
+    total_seconds = models.PositiveBigIntegerField(default=0)
+    longest_seconds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['officer', 'date'], name='officerdailyhours_officer_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='officerdailyhours_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.officer_id} - {self.date}"
+
+class ReportJob(models.Model):
+    """A queued time report export, rendered by ``manage.py run_report_worker``.
+
+    Finished artifacts are stored under ``REPORT_ARTIFACT_DIR`` and reused by
+    later requests for the same format, range and data version.
+    """
+    FORMAT_PDF = 'pdf'
+    FORMAT_CSV = 'csv'
+    FORMAT_CHOICES = [
+        (FORMAT_PDF, 'PDF report'),
+        (FORMAT_CSV, 'Summary CSV'),
+    ]
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    format = models.CharField(max_length=8, choices=FORMAT_CHOICES)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    data_version = models.CharField(max_length=32)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    artifact = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.CharField(max_length=150, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+            models.Index(fields=['format', 'start_date', 'end_date', 'data_version'], name='reportjob_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.format} {self.start_date or 'start'}..{self.end_date or 'end'} ({self.status})"
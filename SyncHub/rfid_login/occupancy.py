@@ -0,0 +1,167 @@
+"""How many officers were on site over time.
+
+Each TimeLog is an interval. ``presence_curve`` sorts the interval starts
+and ends once and sweeps over them, giving a step function of the head
+count (O(n log n)). ``bucket_curve`` then reads peak and average presence
+per bucket in one merged pass over the steps and the buckets, so a month of
+taps costs one query no matter how small the buckets are.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import TimeLog
+
+BUCKET_CHOICES = (15, 30, 60, 120, 240)  # minutes
+DEFAULT_BUCKET = 60
+DEFAULT_RANGE_DAYS = 7
+# Longest range served; 15-minute buckets over it are still a few thousand points.
+MAX_RANGE_DAYS = 92
+
+
+def presence_curve(intervals):
+    """Return ``[(moment, head_count), ...]`` change points for the intervals.
+
+    ``intervals`` is an iterable of ``(start, end)`` pairs. At equal
+    timestamps departures are applied before arrivals, so back-to-back
+    sessions don't count the officer twice.
+    """
+    events = []
+    for start, end in intervals:
+        if end > start:
+            events.append((start, 1))
+            events.append((end, -1))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    curve = []
+    count = 0
+    for moment, delta in events:
+        count += delta
+        if curve and curve[-1][0] == moment:
+            curve[-1] = (moment, count)
+        else:
+            curve.append((moment, count))
+    return curve
+
+
+def bucket_curve(curve, window_start, window_end, bucket):
+    """Peak and time-weighted average head count per bucket of the window."""
+    buckets = []
+    index = 0
+    count = 0
+    # Presence at the start of the window.
+    while index < len(curve) and curve[index][0] <= window_start:
+        count = curve[index][1]
+        index += 1
+
+    bucket_start = window_start
+    while bucket_start < window_end:
+        bucket_end = min(bucket_start + bucket, window_end)
+        peak = count
+        weighted = 0.0
+        cursor = bucket_start
+        while index < len(curve) and curve[index][0] < bucket_end:
+            moment, next_count = curve[index]
+            weighted += count * (moment - cursor).total_seconds()
+            cursor = moment
+            count = next_count
+            peak = max(peak, count)
+            index += 1
+        weighted += count * (bucket_end - cursor).total_seconds()
+        buckets.append({
+            'start': bucket_start,
+            'end': bucket_end,
+            'peak': peak,
+            'average': weighted / (bucket_end - bucket_start).total_seconds(),
+        })
+        bucket_start = bucket_end
+    return buckets
+
+
+def understaffed_periods(curve, window_start, window_end, min_staff):
+    """Maximal periods in the window where fewer than ``min_staff`` were present.
+
+    ``curve`` must come from intervals clipped to the window.
+    """
+    periods = []
+    gap_start = window_start if min_staff > 0 else None
+    for moment, count in curve:
+        if count < min_staff and gap_start is None:
+            gap_start = moment
+        elif count >= min_staff and gap_start is not None:
+            if moment > gap_start:
+                periods.append((gap_start, moment))
+            gap_start = None
+    if gap_start is not None and gap_start < window_end:
+        periods.append((gap_start, window_end))
+    return periods
+
+
+def _session_intervals(start_date, end_date, window_start, window_end, now):
+    # Logs are dated by their tap day, so a session overlapping the window
+    # has a date within a day of it.
+    logs = TimeLog.objects.filter(
+        date__gte=start_date - timedelta(days=1),
+        date__lte=end_date + timedelta(days=1),
+        time_in__lt=window_end,
+    ).values_list('date', 'time_in', 'time_out')
+    for date, time_in, time_out in logs.iterator(chunk_size=5000):
+        if time_out is None:
+            # An open session is ongoing, but a tap only ever closes the log
+            # of its own day, so it can't run past that day.
+            day_end = datetime.combine(date + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+            time_out = min(now, day_end)
+        if time_out > window_start:
+            yield max(time_in, window_start), min(time_out, window_end)
+
+
+def resolve_range(start_date=None, end_date=None, now=None):
+    """Fill in missing dates; raises ValueError for a reversed or too long range."""
+    end_date = end_date or timezone.localdate(now or timezone.now())
+    start_date = start_date or end_date - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start_date > end_date:
+        raise ValueError('start_date must not be after end_date')
+    if (end_date - start_date).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f'The range can span at most {MAX_RANGE_DAYS} days')
+    return start_date, end_date
+
+
+def build_occupancy(start_date=None, end_date=None, bucket_minutes=DEFAULT_BUCKET, min_staff=None, now=None):
+    """Presence per bucket over whole local days from start to end date.
+
+    Without dates the last ``DEFAULT_RANGE_DAYS`` days up to today are used.
+    Raises ValueError for a range ``resolve_range`` rejects.
+    """
+    now = now or timezone.now()
+    tz = timezone.get_current_timezone()
+    start_date, end_date = resolve_range(start_date, end_date, now)
+    window_start = datetime.combine(start_date, time.min, tzinfo=tz)
+    window_end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz)
+    bucket = timedelta(minutes=bucket_minutes)
+
+    curve = presence_curve(_session_intervals(start_date, end_date, window_start, window_end, now))
+    buckets = bucket_curve(curve, window_start, window_end, bucket)
+
+    # Intervals are clipped to the window, so every change point lies in it.
+    peak_count = max((count for moment, count in curve), default=0)
+    peak_at = next((moment for moment, count in curve if count == peak_count), None)
+    average = sum(b['average'] * (b['end'] - b['start']).total_seconds() for b in buckets)
+    average /= (window_end - window_start).total_seconds()
+
+    result = {
+        'bucket_minutes': bucket_minutes,
+        'labels': [timezone.localtime(b['start'], tz).strftime('%b %d %H:%M') for b in buckets],
+        'peak': [b['peak'] for b in buckets],
+        'average': [round(b['average'], 2) for b in buckets],
+        'peak_count': peak_count,
+        'peak_at': timezone.localtime(peak_at, tz).isoformat() if peak_at and peak_count else None,
+        'average_presence': round(average, 2),
+        'filters': {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()},
+    }
+    if min_staff is not None:
+        result['min_staff'] = min_staff
+        result['understaffed'] = [
+            {'start': timezone.localtime(start, tz).isoformat(), 'end': timezone.localtime(end, tz).isoformat()}
+            for start, end in understaffed_periods(curve, window_start, window_end, min_staff)
+        ]
+    return result
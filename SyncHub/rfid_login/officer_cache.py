@@ -0,0 +1,59 @@
+"""In-process cache mapping scanned IDs to Officer records.
+
+Entries are evicted least-recently-used once the cache is full and expire
+after a TTL. Unknown IDs are cached as negative entries with a shorter TTL
+so repeated taps of an unregistered card don't hit the database either.
+Invalidation is wired to model signals in ``rfid_login.signals``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+MISSING = object()
+
+
+class OfficerCache:
+    def __init__(self, max_size=2048, ttl=300, negative_ttl=15):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, officer_id):
+        """Return the cached Officer, None for a cached miss, or MISSING."""
+        with self._lock:
+            entry = self._entries.get(officer_id)
+            if entry is None:
+                return MISSING
+            officer, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[officer_id]
+                return MISSING
+            self._entries.move_to_end(officer_id)
+            return officer
+
+    def set(self, officer_id, officer):
+        ttl = self.ttl if officer is not None else self.negative_ttl
+        with self._lock:
+            self._entries[officer_id] = (officer, time.monotonic() + ttl)
+            self._entries.move_to_end(officer_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, officer_id):
+        with self._lock:
+            self._entries.pop(officer_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+officer_cache = OfficerCache(
+    max_size=getattr(settings, 'RFID_OFFICER_CACHE_SIZE', 2048),
+    ttl=getattr(settings, 'RFID_OFFICER_CACHE_TTL', 300),
+    negative_ttl=getattr(settings, 'RFID_OFFICER_CACHE_NEGATIVE_TTL', 15),
+)
@@ -0,0 +1,198 @@
+"""Background rendering of time report downloads.
+
+Requests enqueue a ReportJob row; ``manage.py run_report_worker`` claims
+queued jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several workers can
+share one queue. Artifacts are named after the format, date range and a
+fingerprint of the range's rollup rows, so a request for a range that hasn't
+changed since the last render is answered from the stored file without
+queueing anything.
+
+The fingerprint is read from the database rather than from the report
+cache's version tokens: those live in each process's cache, so the web
+processes and the worker would disagree about them.
+"""
+import hashlib
+import io
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from SyncHub import metrics
+
+from .exports import render_pdf, write_summary_csv
+from .models import OfficerDailyHours, ReportJob
+from .reports import build_time_report
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    ReportJob.FORMAT_PDF: 'application/pdf',
+    ReportJob.FORMAT_CSV: 'text/csv',
+}
+ACTIVE_STATUSES = [ReportJob.STATUS_QUEUED, ReportJob.STATUS_RUNNING]
+# Keeps the per-row checksum terms small enough to sum without overflow.
+CHECKSUM_MODULUS = 1000003
+
+
+def artifact_dir():
+    return Path(getattr(settings, 'REPORT_ARTIFACT_DIR', Path(settings.BASE_DIR) / 'report_artifacts'))
+
+
+def artifact_name(format, start_date, end_date, data_version):
+    return f"time_report_{start_date or 'start'}_to_{end_date or 'end'}_{data_version}.{format}"
+
+
+def artifact_path(job):
+    return artifact_dir() / job.artifact
+
+
+def download_name(job):
+    return f"time_report_{job.start_date or 'start'}_to_{job.end_date or 'end'}.{job.format}"
+
+
+def data_version(start_date=None, end_date=None):
+    """Fingerprint of the rollup rows (and their officers' names) a report of the range reads.
+
+    One aggregate over the range plus the names of the officers in it. The
+    checksum weighs every row's totals by its id, so moving hours between
+    officers or days changes it as well; the names are hashed as they are,
+    so any rename shows up.
+    """
+    days = OfficerDailyHours.objects.all()
+    if start_date:
+        days = days.filter(date__gte=start_date)
+    if end_date:
+        days = days.filter(date__lte=end_date)
+    summary = days.aggregate(
+        rows=Count('id'),
+        last_id=Max('id'),
+        sessions=Sum('session_count'),
+        seconds=Sum('total_seconds'),
+        checksum=Sum(
+            F('id') * (F('total_seconds') + 3 * F('longest_seconds') + 7 * F('session_count') + 1)
+            % CHECKSUM_MODULUS
+        ),
+    )
+    digest = hashlib.sha1()
+    digest.update('|'.join(str(summary[name] or 0) for name in ('rows', 'last_id', 'sessions', 'seconds', 'checksum')).encode())
+    officers = days.order_by('officer_id').values_list('officer_id', 'officer__name').distinct()
+    for officer_id, name in officers:
+        digest.update(f'\x00{officer_id}\x00{name}'.encode())
+    return digest.hexdigest()[:16]
+
+
+def request_report(format, start_date=None, end_date=None, requested_by=''):
+    """Return a job that has produced, or will produce, the requested report.
+
+    A finished job whose artifact still exists is reused when the range's
+    data hasn't changed; so is a job for the same report that is still
+    waiting or running. Otherwise a new job is queued.
+    """
+    version = data_version(start_date, end_date)
+    jobs = ReportJob.objects.filter(
+        format=format, start_date=start_date, end_date=end_date, data_version=version,
+    ).order_by('-created_at')
+    for job in jobs.filter(status=ReportJob.STATUS_DONE):
+        if artifact_path(job).exists():
+            return job
+    job = jobs.filter(status__in=ACTIVE_STATUSES).first()
+    if job is not None:
+        return job
+    return ReportJob.objects.create(
+        format=format, start_date=start_date, end_date=end_date,
+        data_version=version, requested_by=requested_by,
+    )
+
+
+def claim_next_job():
+    """Mark the oldest runnable job as running and return it, or None.
+
+    Jobs left running longer than ``REPORT_JOB_TIMEOUT`` are assumed to
+    belong to a worker that died and are picked up again.
+    """
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 600))
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ReportJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            job = (
+                ReportJob.objects.select_for_update(skip_locked=True)
+                .filter(status=ReportJob.STATUS_RUNNING, started_at__lt=stale_before)
+                .order_by('started_at')
+                .first()
+            )
+        if job is None:
+            return None
+        job.status = ReportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_job(job):
+    """Render a claimed job's artifact and record the outcome."""
+    start_date = job.start_date.isoformat() if job.start_date else None
+    end_date = job.end_date.isoformat() if job.end_date else None
+    try:
+        # The version is read again before computing: anything written after
+        # the job was queued is then covered by the stored artifact's name.
+        # The report is built from the database, not this process's report
+        # cache, which never hears about writes made by the web processes.
+        version = data_version(start_date, end_date)
+        data = build_time_report(start_date, end_date)
+        if job.format == ReportJob.FORMAT_PDF:
+            content = render_pdf(data)
+        else:
+            buffer = io.StringIO()
+            write_summary_csv(data, buffer)
+            content = buffer.getvalue().encode('utf-8')
+        metrics.export_bytes.observe(len(content), format=job.format)
+
+        name = artifact_name(job.format, start_date, end_date, version)
+        path = artifact_dir() / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a download never sees a half-written file.
+        tmp_path = path.with_name(f'.{name}.{os.getpid()}.tmp')
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+    except Exception as exc:
+        logger.exception("Report job %s failed", job.pk)
+        job.status = ReportJob.STATUS_FAILED
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    job.status = ReportJob.STATUS_DONE
+    job.data_version = version
+    job.artifact = name
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'data_version', 'artifact', 'error', 'finished_at'])
+    _prune_superseded(job)
+    return job
+
+
+def _prune_superseded(job):
+    """Delete artifacts of older renders of the same report."""
+    older = ReportJob.objects.filter(
+        format=job.format, start_date=job.start_date, end_date=job.end_date,
+        status=ReportJob.STATUS_DONE, created_at__lte=job.created_at,
+    ).exclude(pk=job.pk)
+    for old in older:
+        if old.artifact and old.artifact != job.artifact:
+            try:
+                artifact_path(old).unlink()
+            except FileNotFoundError:
+                pass
+    older.delete()
@@ -0,0 +1,103 @@
+"""Time report aggregation shared by the reports page and its exports.
+
+Reports read the OfficerDailyHours rollup rather than raw TimeLog rows, with
+grouped queries (per date, per period when coarser than a day, and per
+officer), so their cost scales with days x officers instead of with the
+number of taps.
+"""
+from django.db.models import Count, F, Max, Sum
+
+from SyncHub.granularity import AUTO as GRANULARITY_AUTO, DAY, label, resolve as resolve_granularity, trunc
+
+from .models import OfficerDailyHours
+
+
+def _hours(seconds):
+    return seconds / 3600 if seconds else 0
+
+
+def _totals_by(days, period):
+    """Totals per ``period`` expression. Every officer with a log on a date
+    has a rollup row; hours only include closed sessions."""
+    rows = []
+    for row in days.values(period=period).annotate(
+        total_officers=Count('officer', distinct=True),
+        total_seconds=Sum('total_seconds'),
+        closed_sessions=Sum('session_count'),
+    ).order_by('period'):
+        rows.append({
+            'date': row['period'],
+            'total_officers': row['total_officers'],
+            'total_hours': _hours(row['total_seconds']),
+            'closed_sessions': row['closed_sessions'],
+        })
+    return rows
+
+
+def build_time_report(start_date=None, end_date=None, granularity=GRANULARITY_AUTO):
+    """Return the time report metrics for an optional date range.
+
+    The per-period series (``logs_by_date`` and the chart lists) are grouped
+    by ``granularity``: day, week, month or auto (see ``SyncHub.granularity``).
+    Date-based metrics such as the most active date are always per day.
+    """
+    days = OfficerDailyHours.objects.all()
+    if start_date:
+        days = days.filter(date__gte=start_date)
+    if end_date:
+        days = days.filter(date__lte=end_date)
+
+    daily = _totals_by(days, F('date'))
+    first = start_date or (daily[0]['date'] if daily else None)
+    last = end_date or (daily[-1]['date'] if daily else None)
+    resolved = resolve_granularity(granularity, first, last)
+    logs_by_date = daily if resolved == DAY else _totals_by(days, trunc(resolved, 'date'))
+
+    # Per-officer totals and longest single session over closed logs.
+    officer_rows = days.filter(session_count__gt=0).values('officer_id', 'officer__name').annotate(
+        total_seconds=Sum('total_seconds'),
+        longest_seconds=Max('longest_seconds'),
+    )
+    officer_hours = []
+    highest_single_day_hours = 0
+    for row in officer_rows:
+        officer_hours.append((row['officer__name'], _hours(row['total_seconds'])))
+        highest_single_day_hours = max(highest_single_day_hours, _hours(row['longest_seconds']))
+    officer_hours.sort(key=lambda x: x[1], reverse=True)
+
+    if officer_hours:
+        most_active_officer = officer_hours[0][0]
+        top_3_officers = [name for name, hours in officer_hours[:3]]
+    else:
+        most_active_officer = "N/A"
+        top_3_officers = []
+
+    total_officers = len(officer_hours)
+    total_hours_all = sum(hours for name, hours in officer_hours)
+    average_hours_per_officer = total_hours_all / total_officers if total_officers > 0 else 0
+
+    # Dates with at least one closed session.
+    covered = [row for row in daily if row['closed_sessions']]
+    if covered:
+        most_active_date = str(max(covered, key=lambda row: row['total_hours'])['date'])
+    else:
+        most_active_date = "N/A"
+
+    return {
+        'logs_by_date': logs_by_date,
+        'granularity': resolved,
+        'officer_hours': officer_hours,
+        'dates': [label(resolved, row['date']) for row in logs_by_date],
+        'officers_count': [row['total_officers'] for row in logs_by_date],
+        'total_hours_list': [round(row['total_hours'], 2) for row in logs_by_date],
+        'officer_names': [name for name, hours in officer_hours],
+        'officer_total_hours': [round(hours, 2) for name, hours in officer_hours],
+        'most_active_officer': most_active_officer,
+        'top_3_officers': top_3_officers,
+        'highest_single_day_hours': round(highest_single_day_hours, 2),
+        'average_hours_per_officer': round(average_hours_per_officer, 2),
+        'total_officers': total_officers,
+        'most_active_date': most_active_date,
+        'total_days_covered': len(covered),
+        'filters': {'start_date': start_date, 'end_date': end_date, 'granularity': granularity},
+    }
@@ -0,0 +1,109 @@
+"""Maintenance of the OfficerDailyHours rollup.
+
+Live taps update it incrementally: a row is created when an officer's first
+log of the day opens, and its totals grow as sessions close. Batch
+ingestion applies the same totals in bulk with ``apply_logs``. Any other
+save or delete of a single TimeLog (an edit) recomputes that officer's day
+from its logs with ``refresh``. All of them run inside the caller's
+transaction, so the rollup commits or rolls back together with the logs.
+"""
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Greatest
+
+from .models import OfficerDailyHours, TimeLog
+
+
+def mark_present(officer_id, date):
+    """Ensure a rollup row exists for the officer's day."""
+    OfficerDailyHours.objects.bulk_create(
+        [OfficerDailyHours(officer_id=officer_id, date=date)], ignore_conflicts=True
+    )
+
+
+def add_closed_session(officer_id, date, seconds):
+    """Add one closed session to the officer's daily totals."""
+    updated = OfficerDailyHours.objects.filter(officer_id=officer_id, date=date).update(
+        session_count=F('session_count') + 1,
+        total_seconds=F('total_seconds') + seconds,
+        longest_seconds=Greatest(F('longest_seconds'), seconds),
+    )
+    if not updated:
+        # The session opened before the rollup existed.
+        mark_present(officer_id, date)
+        add_closed_session(officer_id, date, seconds)
+
+
+def refresh(officer_id, date):
+    """Recompute one officer's day from TimeLog; drop the row if no logs are left."""
+    totals = TimeLog.objects.filter(officer_id=officer_id, date=date).aggregate(
+        logs=Count('id'),
+        session_count=Count('duration_seconds'),
+        total_seconds=Sum('duration_seconds'),
+        longest_seconds=Max('duration_seconds'),
+    )
+    if not totals['logs']:
+        OfficerDailyHours.objects.filter(officer_id=officer_id, date=date).delete()
+        return
+    mark_present(officer_id, date)
+    OfficerDailyHours.objects.filter(officer_id=officer_id, date=date).update(
+        session_count=totals['session_count'],
+        total_seconds=totals['total_seconds'] or 0,
+        longest_seconds=totals['longest_seconds'] or 0,
+    )
+
+
+def apply_logs(opened, closed):
+    """Bulk variant for batch ingestion.
+
+    ``opened`` is an iterable of ``(officer_id, date)`` keys and ``closed`` an
+    iterable of ``(officer_id, date, seconds)`` sessions.
+    """
+    deltas = {}
+    for officer_id, date, seconds in closed:
+        delta = deltas.setdefault((officer_id, date), [0, 0, 0])
+        delta[0] += 1
+        delta[1] += seconds
+        delta[2] = max(delta[2], seconds)
+    keys = set(opened) | set(deltas)
+    if not keys:
+        return
+    OfficerDailyHours.objects.bulk_create(
+        [OfficerDailyHours(officer_id=officer_id, date=date) for officer_id, date in keys],
+        ignore_conflicts=True, batch_size=500,
+    )
+    if not deltas:
+        return
+    officer_ids = sorted({officer_id for officer_id, date in deltas})
+    dates = {date for officer_id, date in deltas}
+    to_update = []
+    for i in range(0, len(officer_ids), 500):
+        rows = OfficerDailyHours.objects.select_for_update().filter(
+            officer_id__in=officer_ids[i:i + 500], date__in=dates
+        )
+        for row in rows:
+            delta = deltas.get((row.officer_id, row.date))
+            if delta is None:
+                continue
+            row.session_count += delta[0]
+            row.total_seconds += delta[1]
+            row.longest_seconds = max(row.longest_seconds, delta[2])
+            to_update.append(row)
+    OfficerDailyHours.objects.bulk_update(
+        to_update, ['session_count', 'total_seconds', 'longest_seconds'], batch_size=500
+    )
+
+
+def compute_rollup(logs):
+    """Aggregate ``(officer_id, date, duration_seconds)`` rows into rollup totals.
+
+    Open logs have no duration. Returns
+    ``{(officer_id, date): [session_count, total_seconds, longest_seconds]}``.
+    """
+    totals = {}
+    for officer_id, date, seconds in logs:
+        row = totals.setdefault((officer_id, date), [0, 0, 0])
+        if seconds is not None:
+            row[0] += 1
+            row[1] += seconds
+            row[2] = max(row[2], seconds)
+    return totals
@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date
+
+from SyncHub import report_cache
+from SyncHub.models import CustomUser
+from . import rollup
+from .models import Officer, TimeLog
+from .officer_cache import officer_cache
+
+
+@receiver(post_save, sender=Officer)
+@receiver(post_delete, sender=Officer)
+def invalidate_officer(sender, instance, **kwargs):
+    officer_cache.invalidate(instance.pk)
+    # Reports show officer names, and deleting an officer drops their logs.
+    report_cache.invalidate_all('time')
+
+
+@receiver(post_save, sender=TimeLog)
+def invalidate_time_reports(sender, instance, **kwargs):
+    report_cache.invalidate('time', [instance.date])
+
+
+@receiver(post_init, sender=TimeLog)
+def remember_rollup_key(sender, instance, **kwargs):
+    # The officer and day the log was loaded with, so moving it to another
+    # day also corrects the day it left. Read from __dict__ so deferred
+    # fields aren't fetched for every loaded log.
+    officer_id, date = instance.__dict__.get('officer_id'), instance.__dict__.get('date')
+    instance._rollup_key = (officer_id, date) if instance.pk and officer_id and date else None
+
+
+@receiver(post_save, sender=TimeLog)
+def refresh_rollup_on_save(sender, instance, raw=False, **kwargs):
+    # Instances created with a string date keep it until reloaded.
+    date = parse_date(instance.date) if isinstance(instance.date, str) else instance.date
+    key = (instance.officer_id, date)
+    previous = instance._rollup_key
+    instance._rollup_key = key
+    if raw:
+        return
+    if instance.rollup_applied:
+        # A live tap, which updates its own totals incrementally.
+        instance.rollup_applied = False
+        return
+    rollup.refresh(*key)
+    if previous and previous != key:
+        rollup.refresh(*previous)
+        report_cache.invalidate('time', [previous[1]])
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_student_number(sender, instance, update_fields=None, **kwargs):
+    # A new or renumbered user can turn a cached "unknown card" into a valid one.
+    # Plain logins only touch last_login and don't affect officer resolution.
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    if instance.student_number:
+        officer_cache.invalidate(instance.student_number)
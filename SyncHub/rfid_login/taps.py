@@ -0,0 +1,391 @@
+"""Card tap handling shared by the kiosk login page and the reader API."""
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from SyncHub import activity, metrics, report_cache
+from SyncHub.models import Activity, CustomUser
+from . import rollup
+from .models import Officer, TapReceipt, TimeLog
+from .debounce import recent_taps
+from .events import publish_on_commit, time_log_event
+from .officer_cache import MISSING, officer_cache
+
+TAP_IN = 'in'
+TAP_OUT = 'out'
+TAP_DUPLICATE = 'duplicate'
+
+
+def is_valid_officer_id(officer_id):
+    """Officer IDs and student numbers are always exactly 7 digits."""
+    return bool(officer_id) and officer_id.isdigit() and len(officer_id) == 7
+
+
+def resolve_officer(officer_id):
+    """Return the Officer for a scanned ID, or None if the ID is unknown.
+
+    Falls back to a CustomUser with the same student number and creates the
+    matching Officer record on first use. Results, including unknown IDs,
+    are served from the in-process officer cache when possible.
+    """
+    if not is_valid_officer_id(officer_id):
+        return None
+    officer = officer_cache.get(officer_id)
+    if officer is MISSING:
+        officer = _load_officer(officer_id)
+        officer_cache.set(officer_id, officer)
+    return officer
+
+
+def _load_officer(officer_id):
+    officer = Officer.objects.filter(id=officer_id).first()
+    if officer is not None:
+        return officer
+    user = CustomUser.objects.filter(student_number=officer_id).only('first_name', 'last_name').first()
+    if user is None:
+        return None
+    officer, created = Officer.objects.get_or_create(
+        id=officer_id,
+        defaults={'name': f"{user.first_name} {user.last_name}", 'position': 'Member'}
+    )
+    return officer
+
+
+def record_tap(officer, now=None):
+    """Toggle the officer's attendance for today.
+
+    Closes today's open log if there is one, otherwise opens a new log.
+    Returns a ``(direction, log)`` tuple where direction is TAP_IN, TAP_OUT,
+    or TAP_DUPLICATE when a concurrent tap for the same officer won the race
+    or the officer's last recorded tap is within the debounce window.
+    """
+    now = now or timezone.now()
+    today = now.date()
+    window = timedelta(seconds=recent_taps.window)
+    try:
+        with transaction.atomic():
+            # Lock today's open log so a concurrent tap waits for us instead
+            # of closing the same session twice.
+            open_log = TimeLog.objects.select_for_update().filter(
+                officer=officer, date=today, time_out__isnull=True
+            ).order_by('time_in').first()
+            # The in-memory debounce only sees this process's taps; a double
+            # tap split across workers is caught here, against the database.
+            if window:
+                if open_log:
+                    if now - open_log.time_in < window:
+                        return TAP_DUPLICATE, open_log
+                else:
+                    last_log = TimeLog.objects.filter(officer=officer).order_by('-date', '-time_in').first()
+                    if last_log and last_log.time_out and now - last_log.time_out < window:
+                        return TAP_DUPLICATE, last_log
+            if open_log:
+                open_log.time_out = now
+                open_log.rollup_applied = True
+                open_log.save(update_fields=['time_out'])
+                rollup.add_closed_session(officer.pk, today, open_log.duration_seconds)
+                activity.record_tap(TAP_OUT, open_log)
+                publish_on_commit(time_log_event(TAP_OUT, open_log, officer))
+                return TAP_OUT, open_log
+            log = TimeLog(officer=officer, time_in=now, date=today)
+            log.rollup_applied = True
+            log.save(force_insert=True)
+            rollup.mark_present(officer.pk, today)
+            activity.record_tap(TAP_IN, log)
+            publish_on_commit(time_log_event(TAP_IN, log, officer))
+            return TAP_IN, log
+    except IntegrityError:
+        # Another tap opened today's session between our read and insert; the
+        # open-session constraint rejected ours, so it is a duplicate.
+        log = TimeLog.objects.filter(officer=officer, date=today, time_out__isnull=True).first()
+        return TAP_DUPLICATE, log
+
+
+def _observe_tap(direction, started):
+    outcome = direction or 'invalid'
+    metrics.taps.inc(outcome=outcome)
+    metrics.tap_seconds.observe(time.perf_counter() - started, outcome=outcome)
+
+
+def handle_tap(officer_id, now=None):
+    """Debounce, resolve and record a single live tap.
+
+    Returns ``(direction, officer, log)``. Debounced taps return
+    TAP_DUPLICATE without touching the database; unknown IDs return
+    ``(None, None, None)``.
+    """
+    started = time.perf_counter()
+    result = _handle_tap(officer_id, now)
+    _observe_tap(result[0], started)
+    return result
+
+
+def _handle_tap(officer_id, now):
+    if recent_taps.is_duplicate(officer_id):
+        return TAP_DUPLICATE, None, None
+    officer = resolve_officer(officer_id)
+    if officer is None:
+        return None, None, None
+    direction, log = record_tap(officer, now=now)
+    return direction, officer, log
+
+
+async def ahandle_tap(officer_id, now=None):
+    """Async version of handle_tap.
+
+    Debounced taps and officer cache hits are answered on the event loop.
+    The locked toggle runs in a worker thread because Django's async ORM
+    can't run transactions.
+    """
+    started = time.perf_counter()
+    result = await _ahandle_tap(officer_id, now)
+    _observe_tap(result[0], started)
+    return result
+
+
+async def _ahandle_tap(officer_id, now):
+    if recent_taps.is_duplicate(officer_id):
+        return TAP_DUPLICATE, None, None
+    if not is_valid_officer_id(officer_id):
+        return None, None, None
+    officer = officer_cache.get(officer_id)
+    if officer is MISSING:
+        officer = await sync_to_async(resolve_officer)(officer_id)
+    if officer is None:
+        return None, None, None
+    direction, log = await sync_to_async(record_tap)(officer, now=now)
+    return direction, officer, log
+
+
+# Keeps IN (...) lookups under SQLite's bound parameter limit.
+LOOKUP_CHUNK_SIZE = 500
+
+# Arbitrary application-wide key for pg_advisory_xact_lock.
+BATCH_INGEST_LOCK_ID = 0x7461707300
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _parse_tap(raw):
+    """Validate one uploaded tap. Returns (tap, None) or (None, reason)."""
+    if not isinstance(raw, dict):
+        return None, 'Tap must be an object.'
+    key = str(raw.get('idempotency_key') or '').strip()
+    if not key or len(key) > 64:
+        return None, 'idempotency_key is required (max 64 characters).'
+    officer_id = str(raw.get('officer_id') or '').strip()
+    if not is_valid_officer_id(officer_id):
+        return None, 'Invalid officer ID'
+    scanned_at = raw.get('scanned_at')
+    scanned_at = parse_datetime(scanned_at) if isinstance(scanned_at, str) else None
+    if scanned_at is None:
+        return None, 'scanned_at must be an ISO 8601 timestamp.'
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    # Live taps bucket sessions by the UTC date of timezone.now(); do the
+    # same whatever offset the reader sent.
+    scanned_at = scanned_at.astimezone(dt_timezone.utc)
+    return {
+        'idempotency_key': key,
+        'officer_id': officer_id,
+        'scanned_at': scanned_at,
+        'device_id': str(raw.get('device_id') or '')[:64],
+    }, None
+
+
+def _resolve_officers(officer_ids):
+    """Bulk version of resolve_officer. Returns {officer_id: Officer}."""
+    officers = {}
+    pending = []
+    for officer_id in officer_ids:
+        officer = officer_cache.get(officer_id)
+        if officer is MISSING:
+            pending.append(officer_id)
+        elif officer is not None:
+            officers[officer_id] = officer
+    if not pending:
+        return officers
+    loaded = {}
+    for chunk in _chunks(pending):
+        loaded.update(Officer.objects.in_bulk(chunk))
+    unknown = [officer_id for officer_id in pending if officer_id not in loaded]
+    new_officers = []
+    for chunk in _chunks(unknown):
+        users = CustomUser.objects.filter(student_number__in=chunk).values_list('student_number', 'first_name', 'last_name')
+        for student_number, first_name, last_name in users:
+            new_officers.append(Officer(id=student_number, name=f"{first_name} {last_name}", position='Member'))
+    if new_officers:
+        Officer.objects.bulk_create(new_officers, ignore_conflicts=True)
+        loaded.update((officer.id, officer) for officer in new_officers)
+    for officer_id in pending:
+        officer_cache.set(officer_id, loaded.get(officer_id))
+    officers.update(loaded)
+    return officers
+
+
+def ingest_taps(raw_taps):
+    """Replay a backlog of buffered taps against TimeLog.
+
+    Taps are applied in scan-time order with the same in/out toggle as
+    record_tap, using each tap's own timestamp. Taps whose idempotency key
+    was already ingested are skipped, so readers can safely retry uploads.
+
+    Repeat scans of the same card within the debounce window are dropped
+    the same way live taps are. Sessions are dated by the tap's UTC date,
+    like live taps. A tap that is older than the open session it would
+    close, or than the end of the officer's latest closed session, is
+    counted as stale and not applied.
+
+    Returns a summary dict with ``applied``, ``duplicates``, ``debounced``,
+    ``stale`` and ``rejected`` (a list of ``{index, idempotency_key, message}``).
+    """
+    rejected = []
+    taps = []
+    seen_keys = set()
+    duplicates = 0
+    for index, raw in enumerate(raw_taps):
+        tap, error = _parse_tap(raw)
+        if error:
+            key = raw.get('idempotency_key') if isinstance(raw, dict) else None
+            rejected.append({'index': index, 'idempotency_key': key, 'message': error})
+        elif tap['idempotency_key'] in seen_keys:
+            duplicates += 1
+        else:
+            seen_keys.add(tap['idempotency_key'])
+            tap['index'] = index
+            taps.append(tap)
+
+    applied = 0
+    stale = 0
+    debounced = 0
+    window = timedelta(seconds=recent_taps.window)
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Serialize batch uploads so a retried batch racing its original
+            # can't slip past the idempotency check.
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [BATCH_INGEST_LOCK_ID])
+
+        known_keys = set()
+        for chunk in _chunks(seen_keys):
+            known_keys.update(TapReceipt.objects.filter(idempotency_key__in=chunk).values_list('idempotency_key', flat=True))
+        duplicates += sum(1 for tap in taps if tap['idempotency_key'] in known_keys)
+        taps = [tap for tap in taps if tap['idempotency_key'] not in known_keys]
+
+        officers = _resolve_officers({tap['officer_id'] for tap in taps})
+        accepted = []
+        for tap in taps:
+            if tap['officer_id'] in officers:
+                accepted.append(tap)
+            else:
+                rejected.append({'index': tap['index'], 'idempotency_key': tap['idempotency_key'], 'message': 'Invalid officer ID'})
+        accepted.sort(key=lambda tap: tap['scanned_at'])
+
+        # Currently open logs for the officers and days covered by the batch.
+        open_logs = {}
+        dates = {tap['scanned_at'].date() for tap in accepted}
+        for chunk in _chunks({tap['officer_id'] for tap in accepted}):
+            logs = TimeLog.objects.select_for_update().filter(
+                officer_id__in=chunk, date__in=dates, time_out__isnull=True
+            ).order_by('-time_in')
+            for log in logs:
+                # Ordered newest first so the earliest open log wins, like record_tap.
+                open_logs[(log.officer_id, log.date)] = log
+
+        # End of each officer's latest closed session. A replayed tap from
+        # before it can't open a session: the officer has tapped in and out
+        # since, and the session would stay open with bogus hours.
+        closed_until = {}
+        if dates:
+            since = min(dates) - timedelta(days=1)
+            for chunk in _chunks({tap['officer_id'] for tap in accepted}):
+                closed_until.update(
+                    TimeLog.objects.filter(officer_id__in=chunk, date__gte=since, time_out__isnull=False)
+                    .values('officer_id').annotate(last_out=Max('time_out')).values_list('officer_id', 'last_out')
+                )
+
+        to_create = []
+        to_update = []
+        feed = []
+        last_scan = {}
+        for tap in accepted:
+            scanned_at = tap['scanned_at']
+            previous = last_scan.get(tap['officer_id'])
+            if previous is not None and scanned_at - previous < window:
+                debounced += 1
+                continue
+            last_scan[tap['officer_id']] = scanned_at
+            state_key = (tap['officer_id'], scanned_at.date())
+            open_log = open_logs.get(state_key)
+            if open_log is None:
+                last_out = closed_until.get(tap['officer_id'])
+                if last_out is not None and scanned_at <= last_out:
+                    stale += 1
+                    continue
+                log = TimeLog(officer=officers[tap['officer_id']], time_in=scanned_at, date=scanned_at.date())
+                to_create.append(log)
+                open_logs[state_key] = log
+                feed.append(activity.tap_activities(log)[0])
+            elif scanned_at <= open_log.time_in:
+                # Older than the session it would close; keep the receipt but don't apply it.
+                stale += 1
+                continue
+            else:
+                open_log.time_out = scanned_at
+                open_log.set_duration()
+                closed_until[tap['officer_id']] = scanned_at
+                if open_log.pk is not None:
+                    to_update.append(open_log)
+                feed.append(activity.tap_activities(open_log)[-1])
+                del open_logs[state_key]
+            applied += 1
+
+        TimeLog.objects.bulk_create(to_create, batch_size=LOOKUP_CHUNK_SIZE)
+        TimeLog.objects.bulk_update(to_update, ['time_out', 'duration_seconds'], batch_size=LOOKUP_CHUNK_SIZE)
+        rollup.apply_logs(
+            opened=[(log.officer_id, log.date) for log in to_create],
+            closed=[
+                (log.officer_id, log.date, log.duration_seconds)
+                for log in to_create + to_update if log.time_out
+            ],
+        )
+        TapReceipt.objects.bulk_create([
+            TapReceipt(
+                idempotency_key=tap['idempotency_key'],
+                device_id=tap['device_id'],
+                officer_id=tap['officer_id'],
+                scanned_at=tap['scanned_at'],
+            )
+            for tap in accepted
+        ], batch_size=LOOKUP_CHUNK_SIZE)
+        Activity.objects.bulk_create(feed, batch_size=LOOKUP_CHUNK_SIZE)
+        # Bulk writes skip model signals, so invalidate cached reports here.
+        report_cache.invalidate('time', {log.date for log in to_create + to_update})
+        if applied:
+            # Backfilled history isn't "live"; one event tells pages to refresh.
+            publish_on_commit({'type': 'batch', 'applied': applied})
+
+    rejected.sort(key=lambda item: item['index'])
+    for result, count in (
+        ('applied', applied), ('duplicate', duplicates), ('debounced', debounced),
+        ('stale', stale), ('rejected', len(rejected)),
+    ):
+        if count:
+            metrics.batch_taps.inc(count, result=result)
+    return {
+        'received': len(raw_taps),
+        'applied': applied,
+        'duplicates': duplicates,
+        'debounced': debounced,
+        'stale': stale,
+        'rejected': rejected,
+    }
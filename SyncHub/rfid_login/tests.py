@@ -1,3 +1,394 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from SyncHub.models import CustomUser
+from SyncHub.profiling import BudgetExceeded
+from . import analytics, occupancy, report_jobs
+from .analytics import build_attendance_analytics
+from .debounce import recent_taps
+from .models import Officer, OfficerDailyHours, ReportJob, TimeLog
+from .rollup import compute_rollup
+from .taps import record_tap
+
+READER_TOKEN = 'test-reader-token'
+
+
+def make_admin(student_number='9000001'):
+    return CustomUser.objects.create_superuser(
+        student_number=student_number, username=f'admin{student_number}', password='pw',
+        email=f'{student_number}@example.com', first_name='Ad', last_name='Min',
+    )
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class ProfilingBudgetTests(TestCase):
+    def setUp(self):
+        self.client.force_login(make_admin())
+
+    def test_test_settings_fail_on_budget(self):
+        with self.settings(PROFILING_BUDGETS={'rfid_login:time_log': {'queries': 1}}):
+            with self.assertRaisesMessage(BudgetExceeded, 'rfid_login:time_log exceeded its budget: queries='):
+                self.client.get(reverse('rfid_login:time_log'))
+
+    @override_settings(PROFILING_FAIL_ON_BUDGET=False, PROFILING_BUDGETS={'rfid_login:time_log': {'queries': 1}})
+    def test_overrun_only_warns_when_not_failing(self):
+        with self.assertLogs('SyncHub.profiling', 'WARNING') as logs:
+            response = self.client.get(reverse('rfid_login:time_log'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rfid_login:time_log exceeded its budget', logs.output[-1])
+
+    def test_within_budget(self):
+        response = self.client.get(reverse('rfid_login:time_log'))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(RFID_READER_TOKEN=READER_TOKEN)
+class TapApiTests(TestCase):
+    def setUp(self):
+        recent_taps.clear()
+        self.officer = Officer.objects.create(id='1234567', name='Ada Officer', position='Member')
+
+    def tap(self, officer_id='1234567', token=READER_TOKEN):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.post(
+            reverse('rfid_login:tap_api'), json.dumps({'officer_id': officer_id}),
+            content_type='application/json', headers=headers,
+        )
+
+    def test_requires_reader_token(self):
+        self.assertEqual(self.tap(token=None).status_code, 401)
+        self.assertEqual(self.tap(token='wrong').status_code, 401)
+        self.assertFalse(TimeLog.objects.exists())
+
+    def test_tap_in(self):
+        response = self.tap()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['status'], response.json()['officer']), ('in', 'Ada Officer'))
+        self.assertIsNone(TimeLog.objects.get().time_out)
+
+    def test_repeat_scan_is_a_duplicate(self):
+        self.assertEqual(self.tap().json()['status'], 'in')
+        self.assertEqual(self.tap().json()['status'], 'duplicate')
+        self.assertEqual(TimeLog.objects.count(), 1)
+
+    def test_repeat_scan_missed_by_the_memory_debounce_is_a_duplicate(self):
+        # Another worker's tap: only the database check sees it.
+        self.assertEqual(self.tap().json()['status'], 'in')
+        recent_taps.clear()
+        self.assertEqual(self.tap().json()['status'], 'duplicate')
+        self.assertEqual(TimeLog.objects.count(), 1)
+
+    def test_unknown_officer(self):
+        self.assertEqual(self.tap('7654321').status_code, 404)
+
+
+@override_settings(RFID_READER_TOKEN=READER_TOKEN)
+class TapBatchApiTests(TestCase):
+    def setUp(self):
+        self.officer = Officer.objects.create(id='1234567', name='Ada Officer', position='Member')
+
+    def upload(self, taps, token=READER_TOKEN):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.post(
+            reverse('rfid_login:tap_batch_api'), json.dumps({'taps': taps}),
+            content_type='application/json', headers=headers,
+        )
+
+    def taps(self, *times):
+        return [
+            {'idempotency_key': f'key-{index}', 'officer_id': '1234567', 'scanned_at': moment.isoformat(), 'device_id': 'kiosk'}
+            for index, moment in enumerate(times)
+        ]
+
+    def test_requires_reader_token(self):
+        self.assertEqual(self.upload(self.taps(utc(2026, 3, 2, 1)), token=None).status_code, 401)
+        self.assertFalse(TimeLog.objects.exists())
+
+    def test_replayed_batch_is_not_applied_twice(self):
+        taps = self.taps(utc(2026, 3, 2, 1), utc(2026, 3, 2, 5))
+        first = self.upload(taps).json()
+        self.assertEqual((first['applied'], first['duplicates']), (2, 0))
+        replay = self.upload(taps).json()
+        self.assertEqual((replay['received'], replay['applied'], replay['duplicates']), (2, 0, 2))
+        log = TimeLog.objects.get()
+        self.assertEqual((log.time_in, log.time_out), (utc(2026, 3, 2, 1), utc(2026, 3, 2, 5)))
+
+    def test_repeated_key_within_a_batch(self):
+        taps = self.taps(utc(2026, 3, 2, 1))
+        result = self.upload(taps + taps).json()
+        self.assertEqual((result['applied'], result['duplicates']), (1, 1))
+
+    def test_repeat_scans_are_debounced(self):
+        result = self.upload(self.taps(utc(2026, 3, 2, 1), utc(2026, 3, 2, 1, 0, 1))).json()
+        self.assertEqual((result['applied'], result['debounced']), (1, 1))
+        self.assertIsNone(TimeLog.objects.get().time_out)
+
+    def test_tap_before_the_latest_closed_session_is_stale(self):
+        self.upload(self.taps(utc(2026, 3, 2, 1), utc(2026, 3, 2, 5)))
+        late = [{'idempotency_key': 'late', 'officer_id': '1234567', 'scanned_at': utc(2026, 3, 2, 3).isoformat()}]
+        result = self.upload(late).json()
+        self.assertEqual((result['applied'], result['stale']), (0, 1))
+        self.assertEqual(TimeLog.objects.count(), 1)
+
+    def test_rejects_invalid_taps(self):
+        result = self.upload([{'idempotency_key': 'a', 'officer_id': '1234567', 'scanned_at': 'yesterday'}]).json()
+        self.assertEqual(result['applied'], 0)
+        self.assertEqual(result['rejected'][0]['message'], 'scanned_at must be an ISO 8601 timestamp.')
+
+
+@override_settings(TIME_LOG_PAGE_SIZE=2)
+class TimeLogPaginationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(make_admin())
+        officer = Officer.objects.create(id='1234567', name='Ada Officer', position='Member')
+        # Two logs share a date, so pages break ties on id.
+        self.logs = [
+            TimeLog.objects.create(officer=officer, date=day, time_in=utc(2026, 3, day.day, hour), time_out=utc(2026, 3, day.day, hour + 1))
+            for day, hour in [(date(2026, 3, 1), 1), (date(2026, 3, 2), 1), (date(2026, 3, 2), 3), (date(2026, 3, 3), 1), (date(2026, 3, 4), 1)]
+        ]
+
+    def page(self, query=''):
+        return self.client.get(reverse('rfid_login:time_log') + query).context
+
+    def test_pages_through_every_log_once(self):
+        seen = []
+        context = self.page()
+        self.assertIsNone(context['newer_url'])
+        while True:
+            seen.extend(log.pk for log in context['time_logs'])
+            if context['older_url'] is None:
+                break
+            context = self.page(context['older_url'])
+        expected = sorted(self.logs, key=lambda log: (log.date, log.pk), reverse=True)
+        self.assertEqual(seen, [log.pk for log in expected])
+
+    def test_newer_page_returns_to_the_previous_page(self):
+        first = self.page()
+        second = self.page(first['older_url'])
+        self.assertIsNotNone(second['newer_url'])
+        back = self.page(second['newer_url'])
+        self.assertEqual([log.pk for log in back['time_logs']], [log.pk for log in first['time_logs']])
+
+    def test_last_page_has_no_older_link(self):
+        last = self.page(f'?after=2026-03-01.{self.logs[0].pk}')
+        self.assertEqual(list(last['time_logs']), [])
+        self.assertIsNone(last['older_url'])
+
+    def test_malformed_cursor_shows_the_first_page(self):
+        context = self.page('?after=garbage')
+        self.assertEqual([log.pk for log in context['time_logs']], [self.logs[4].pk, self.logs[3].pk])
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.officer = Officer.objects.create(id='1234567', name='Ada Officer', position='Member')
+
+    def assertRollupMatchesLogs(self):
+        expected = compute_rollup(TimeLog.objects.values_list('officer_id', 'date', 'duration_seconds'))
+        actual = {
+            (row.officer_id, row.date): [row.session_count, row.total_seconds, row.longest_seconds]
+            for row in OfficerDailyHours.objects.all()
+        }
+        self.assertEqual(actual, expected)
+
+    def test_follows_edits_moves_and_deletes(self):
+        day = date(2026, 3, 2)
+        log = TimeLog.objects.create(officer=self.officer, date=day, time_in=utc(2026, 3, 2, 1))
+        other = TimeLog.objects.create(officer=self.officer, date=day, time_in=utc(2026, 3, 2, 5), time_out=utc(2026, 3, 2, 6))
+        self.assertRollupMatchesLogs()
+
+        log.time_out = utc(2026, 3, 2, 3)
+        log.save()
+        self.assertRollupMatchesLogs()
+        self.assertEqual(OfficerDailyHours.objects.get(date=day).total_seconds, 3 * 3600)
+
+        log.time_out = utc(2026, 3, 2, 2)
+        log.save()
+        self.assertEqual(OfficerDailyHours.objects.get(date=day).longest_seconds, 3600)
+
+        # Moving a log to another day corrects both days, even when reloaded.
+        log = TimeLog.objects.get(pk=log.pk)
+        log.date = date(2026, 3, 3)
+        log.save()
+        self.assertRollupMatchesLogs()
+
+        other.delete()
+        self.assertRollupMatchesLogs()
+        self.assertFalse(OfficerDailyHours.objects.filter(date=day).exists())
+
+    def test_taps_update_totals_incrementally(self):
+        record_tap(self.officer, now=utc(2026, 3, 2, 1))
+        # Only the increment, not a recompute of the day.
+        with self.assertNumQueries(6):
+            record_tap(self.officer, now=utc(2026, 3, 2, 2))
+        record_tap(self.officer, now=utc(2026, 3, 2, 3))
+        record_tap(self.officer, now=utc(2026, 3, 2, 6))
+        self.assertRollupMatchesLogs()
+        self.assertEqual(OfficerDailyHours.objects.get().total_seconds, 4 * 3600)
+
+    def test_deleting_an_officer_deletes_logs_in_bulk(self):
+        for day in range(1, 4):
+            TimeLog.objects.create(officer=self.officer, date=date(2026, 3, day), time_in=utc(2026, 3, day, 1))
+        # One DELETE per table, however many logs the officer has.
+        with self.assertNumQueries(4):
+            self.officer.delete()
+        self.assertFalse(TimeLog.objects.exists())
+
+
+class OccupancyTests(TestCase):
+    def test_back_to_back_sessions_are_not_double_counted(self):
+        curve = occupancy.presence_curve([
+            (utc(2026, 3, 2, 1), utc(2026, 3, 2, 3)),
+            (utc(2026, 3, 2, 3), utc(2026, 3, 2, 5)),
+            (utc(2026, 3, 2, 2), utc(2026, 3, 2, 4)),
+        ])
+        self.assertEqual(curve, [
+            (utc(2026, 3, 2, 1), 1), (utc(2026, 3, 2, 2), 2), (utc(2026, 3, 2, 3), 2),
+            (utc(2026, 3, 2, 4), 1), (utc(2026, 3, 2, 5), 0),
+        ])
+
+    def test_zero_length_sessions_are_ignored(self):
+        moment = utc(2026, 3, 2, 1)
+        self.assertEqual(occupancy.presence_curve([(moment, moment)]), [])
+
+    def test_buckets(self):
+        curve = occupancy.presence_curve([(utc(2026, 3, 2, 1, 30), utc(2026, 3, 2, 3))])
+        buckets = occupancy.bucket_curve(curve, utc(2026, 3, 2, 1), utc(2026, 3, 2, 3), timedelta(hours=1))
+        self.assertEqual([(b['peak'], b['average']) for b in buckets], [(1, 0.5), (1, 1.0)])
+
+    def test_empty_and_zero_length_windows(self):
+        moment = utc(2026, 3, 2, 1)
+        self.assertEqual(occupancy.bucket_curve([], moment, moment, timedelta(hours=1)), [])
+        buckets = occupancy.bucket_curve([], moment, moment + timedelta(hours=2), timedelta(hours=1))
+        self.assertEqual([(b['peak'], b['average']) for b in buckets], [(0, 0.0), (0, 0.0)])
+
+    def test_day_without_logs(self):
+        result = occupancy.build_occupancy(date(2026, 3, 2), date(2026, 3, 2), 60)
+        self.assertEqual(len(result['peak']), 24)
+        self.assertEqual((result['peak_count'], result['peak_at'], result['average_presence']), (0, None, 0))
+
+    def test_api_rejects_reversed_and_overlong_ranges(self):
+        self.client.force_login(make_admin())
+        url = reverse('rfid_login:time_occupancy_api')
+        response = self.client.get(url, {'start_date': '2026-03-03', 'end_date': '2026-03-02'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {'start_date': '2025-01-01', 'end_date': '2026-03-02'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {'start_date': '2026-03-02', 'end_date': '2026-03-02'})
+        self.assertEqual(response.status_code, 200)
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.officer = Officer.objects.create(id='1234567', name='Ada Officer', position='Member')
+
+    def attend(self, *days):
+        for day in days:
+            TimeLog.objects.create(officer=self.officer, date=day, time_in=utc(day.year, day.month, day.day, 1), time_out=utc(day.year, day.month, day.day, 3))
+
+    def test_current_streak_runs_to_today_when_the_range_ends_later(self):
+        today = timezone.now().date()
+        self.attend(today - timedelta(days=2), today - timedelta(days=1), today)
+        result = build_attendance_analytics(today - timedelta(days=10), today + timedelta(days=30))
+        self.assertEqual(result['streaks'][0]['current_streak'], 3)
+        self.assertEqual(result['streaks'][0]['longest_streak'], 3)
+
+    def test_rolling_series_is_capped_to_the_end_of_the_range(self):
+        self.attend(date(2025, 12, 31), date(2026, 1, 1))
+        result = build_attendance_analytics(date(2000, 1, 1), date(2026, 1, 1))
+        rolling = result['rolling']
+        self.assertEqual(len(rolling['dates']), analytics.ROLLING_MAX_DAYS)
+        self.assertEqual(rolling['dates'][-1], '2026-01-01')
+        self.assertEqual(rolling['daily_hours'][-2:], [2.0, 2.0])
+        # Days before the cut still count towards the first averages.
+        self.assertEqual(rolling['avg_7'][-1], round(4 / 7, 2))
+
+    def test_short_range_is_returned_whole(self):
+        self.attend(date(2026, 3, 2))
+        rolling = build_attendance_analytics(date(2026, 3, 1), date(2026, 3, 3))['rolling']
+        self.assertEqual(rolling['dates'], ['2026-03-01', '2026-03-02', '2026-03-03'])
+        self.assertEqual(rolling['avg_7'], [0.0, 1.0, round(2 / 3, 2)])
+
+
+class TimeReportETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(make_admin())
+        self.officer = Officer.objects.create(id='1234567', name='Ada Officer', position='Member')
+        self.url = reverse('rfid_login:time_reports_data_api')
+        self.query = {'start_date': '2026-03-01', 'end_date': '2026-03-31'}
+
+    def test_not_modified_until_a_log_changes(self):
+        response = self.client.get(self.url, self.query)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, self.query, headers={'If-None-Match': etag}).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TimeLog.objects.create(officer=self.officer, date=date(2026, 3, 2), time_in=utc(2026, 3, 2, 1), time_out=utc(2026, 3, 2, 2))
+        response = self.client.get(self.url, self.query, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_write_outside_the_range_keeps_the_etag(self):
+        etag = self.client.get(self.url, self.query)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            TimeLog.objects.create(officer=self.officer, date=date(2026, 5, 2), time_in=utc(2026, 5, 2, 1))
+        self.assertEqual(self.client.get(self.url, self.query, headers={'If-None-Match': etag}).status_code, 304)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(artifacts.cleanup)
+        self.enterContext(self.settings(REPORT_ARTIFACT_DIR=artifacts.name))
+        self.client.force_login(make_admin())
+        self.officer = Officer.objects.create(id='1234567', name='Hugo Tan', position='Member')
+        TimeLog.objects.create(officer=self.officer, date=date(2026, 3, 2), time_in=utc(2026, 3, 2, 1), time_out=utc(2026, 3, 2, 3))
+
+    def export(self):
+        response = self.client.get(reverse('rfid_login:export_csv'), {'start_date': '2026-03-01', 'end_date': '2026-03-31'})
+        return b''.join(response.streaming_content if response.streaming else [response.content]).decode()
+
+    def test_stored_artifact_is_reused_until_the_data_changes(self):
+        job = report_jobs.request_report(ReportJob.FORMAT_CSV, '2026-03-01', '2026-03-31')
+        report_jobs.run_job(report_jobs.claim_next_job())
+        self.assertEqual(report_jobs.request_report(ReportJob.FORMAT_CSV, '2026-03-01', '2026-03-31'), job)
+        self.assertIn('Hugo Tan', self.export())
+
+        # Same length as the old name, so only the names themselves tell them apart.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.officer.name = 'Nat Oguh'
+            self.officer.save()
+        self.assertNotEqual(report_jobs.request_report(ReportJob.FORMAT_CSV, '2026-03-01', '2026-03-31'), job)
+        export = self.export()
+        self.assertIn('Nat Oguh', export)
+        self.assertNotIn('Hugo Tan', export)
+
+
+class RoleTests(TestCase):
+    def test_revoked_role_applies_on_the_next_request(self):
+        user = CustomUser.objects.create_user(
+            student_number='9000002', username='staff', password='pw',
+            email='staff@example.com', first_name='St', last_name='Aff',
+        )
+        staff = Group.objects.create(name='Staff')
+        user.groups.add(staff)
+        self.client.force_login(user)
+        self.assertTrue(self.client.get(reverse('rfid_login:time_log')).context['is_admin'])
+
+        user.groups.remove(staff)
+        response = self.client.get(reverse('rfid_login:time_log'))
+        self.assertFalse(response.context['is_admin'])
+        self.assertEqual(response.context['error'], 'Access denied. Admin privileges required.')
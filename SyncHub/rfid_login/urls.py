@@ -5,8 +5,20 @@ app_name = 'rfid_login'
 
 urlpatterns = [
     path('', views.login_view, name='login'),
+    path('api/tap/', views.tap_api, name='tap_api'),
+    path('api/taps/batch/', views.tap_batch_api, name='tap_batch_api'),
     path('time_log/', views.time_log_view, name='time_log'),
+    path('time_log/stream/', views.time_log_stream, name='time_log_stream'),
     path('time_reports/', views.time_reports_view, name='time_reports'),
+    path('time_reports/data/', views.time_reports_data_api, name='time_reports_data_api'),
+    path('time_reports/analytics/', views.time_analytics_api, name='time_analytics_api'),
+    path('time_reports/occupancy/', views.time_occupancy_api, name='time_occupancy_api'),
+    path('time_reports/export/summary.csv', views.export_csv, name='export_csv'),
+    path('time_reports/export/report.pdf', views.export_pdf, name='export_pdf'),
+    path('time_reports/export/logs.csv', views.export_logs_csv, name='export_logs_csv'),
+    path('time_reports/jobs/', views.report_job_create, name='report_job_create'),
+    path('time_reports/jobs/<int:pk>/', views.report_job_status, name='report_job_status'),
+    path('time_reports/jobs/<int:pk>/download/', views.report_job_download, name='report_job_download'),
     path('officers/', views.officer_list, name='officer_list'),
     path('officers/add/', views.officer_add, name='officer_add'),
     path('officers/<int:pk>/edit/', views.officer_edit, name='officer_edit'),
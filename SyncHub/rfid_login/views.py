@@ -1,83 +1,153 @@
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
-from django.db.models import Q, Count, Sum, Case, When, FloatField, F
+from django.utils.dateparse import parse_date
+from django.db.models import Q, Sum, Case, When, FloatField, F
 from django.db.models.functions import Extract
 from datetime import timedelta
-from .models import Officer, TimeLog
+from . import occupancy, report_jobs
+from .analytics import build_attendance_analytics
+from .exports import render_pdf, write_summary_csv
+from .models import Officer, ReportJob, TimeLog
+from .events import get_event_backend
+from .reports import build_time_report
+from .taps import TAP_DUPLICATE, TAP_OUT, ahandle_tap, ingest_taps
 from django import forms
 from django.contrib.auth.models import User
-from SyncHub.models import CustomUser
+from SyncHub import granularity as granularity_choices, metrics, report_cache
+import asyncio
 import json
 import csv
 import io
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.units import inch
-from io import BytesIO
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.template.loader import render_to_string
+from django.utils.crypto import constant_time_compare
 
 class OfficerForm(forms.ModelForm):
     class Meta:
         model = Officer
         fields = ['id', 'name', 'position']
 
-def login_view(request):
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+async def login_view(request):
+    # Resolve the user asynchronously and hand it to the template so the
+    # auth context processor's lazy request.user is never hit from the loop.
+    user = await request.auser()
+    is_admin = (await request.aroles()).is_admin
     last_log = None
     if request.method == 'POST':
-        officer_id = request.POST.get('officer_id')
-        try:
-            # Try to get officer by ID
-            officer = Officer.objects.get(id=officer_id)
-        except Officer.DoesNotExist:
-            # If officer doesn't exist, check if it's a CustomUser student_number
-            try:
-                user = CustomUser.objects.get(student_number=officer_id)
-                # Create officer record if it doesn't exist
-                officer, created = Officer.objects.get_or_create(
-                    id=officer_id,
-                    defaults={'name': f"{user.first_name} {user.last_name}", 'position': 'Member'}
-                )
-            except CustomUser.DoesNotExist:
-                message = "Invalid officer ID"
-                return render(request, 'rfid_login/login.html', {'message': message, 'is_admin': is_admin, 'last_log': last_log})
-        try:
-            # Check if there's an open time log for today
-            today = timezone.now().date()
-            open_time_log = TimeLog.objects.filter(officer=officer, date=today, time_out__isnull=True).first()
-            if open_time_log:
-                # Time out the earliest open log
-                open_time_log.time_out = timezone.now()
-                open_time_log.save()
-                message = f"Time out recorded for {officer.name}"
-            else:
-                # Time in
-                TimeLog.objects.create(officer=officer, time_in=timezone.now(), date=timezone.now().date())
-                message = f"Time in recorded for {officer.name}"
-            # Get the last log for display
-            last_log = TimeLog.objects.filter(officer=officer).order_by('-date', '-time_in').first()
-            return render(request, 'rfid_login/login.html', {'message': message, 'is_admin': is_admin, 'last_log': last_log})
-        except ValueError:
-            message = "Invalid officer ID format"
-            return render(request, 'rfid_login/login.html', {'message': message, 'is_admin': is_admin, 'last_log': last_log})
-    return render(request, 'rfid_login/login.html', {'is_admin': is_admin, 'last_log': last_log})
+        officer_id = (request.POST.get('officer_id') or '').strip()
+        direction, officer, last_log = await ahandle_tap(officer_id)
+        if direction is None:
+            message = "Invalid officer ID"
+            return render(request, 'rfid_login/login.html', {'message': message, 'is_admin': is_admin, 'last_log': last_log, 'user': user})
+        if direction == TAP_DUPLICATE:
+            message = "Tap already recorded. Please wait a moment before tapping again."
+        elif direction == TAP_OUT:
+            message = f"Time out recorded for {officer.name}"
+        else:
+            message = f"Time in recorded for {officer.name}"
+        return render(request, 'rfid_login/login.html', {'message': message, 'is_admin': is_admin, 'last_log': last_log, 'user': user})
+    return render(request, 'rfid_login/login.html', {'is_admin': is_admin, 'last_log': last_log, 'user': user})
+
+def _is_reader(request):
+    """True if the request carries the RFID_READER_TOKEN bearer token."""
+    token = getattr(settings, 'RFID_READER_TOKEN', None)
+    authorization = request.headers.get('Authorization', '')
+    return bool(token) and constant_time_compare(authorization, f'Bearer {token}')
+
+@csrf_exempt
+async def tap_api(request):
+    """JSON tap endpoint for RFID reader kiosks.
+
+    Requires the reader token. POST expects JSON: { officer_id }
+    Responds with { status: 'in' | 'out', officer, timestamp }, or
+    { status: 'duplicate' } for repeat scans inside the debounce window.
+    """
+    if not _is_reader(request):
+        return JsonResponse({'status': 'invalid', 'message': 'Reader token required.'}, status=401)
+    if request.method != 'POST':
+        return JsonResponse({'status': 'invalid', 'message': 'Method not allowed.'}, status=405)
+    if request.content_type != 'application/json':
+        return JsonResponse({'status': 'invalid', 'message': 'Content-Type must be application/json.'}, status=400)
+    try:
+        payload = json.loads(request.body.decode('utf-8'))
+    except Exception:
+        return JsonResponse({'status': 'invalid', 'message': 'Invalid JSON.'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'status': 'invalid', 'message': 'Invalid JSON.'}, status=400)
+    officer_id = str(payload.get('officer_id') or '').strip()
+    direction, officer, log = await ahandle_tap(officer_id)
+    if direction is None:
+        return JsonResponse({'status': 'invalid', 'message': 'Invalid officer ID'}, status=404)
+    if direction == TAP_DUPLICATE:
+        return JsonResponse({'status': direction, 'message': 'Tap already recorded.'})
+    timestamp = log.time_out if direction == TAP_OUT else log.time_in
+    return JsonResponse({
+        'status': direction,
+        'officer': officer.name,
+        'timestamp': timestamp.isoformat(),
+    })
+
+@csrf_exempt
+def tap_batch_api(request):
+    """Bulk tap upload for readers that buffered taps while offline.
+
+    Requires the reader token. POST expects JSON:
+    { taps: [{ officer_id, scanned_at, device_id, idempotency_key }, ...] }
+    """
+    if not _is_reader(request):
+        return JsonResponse({'message': 'Reader token required.'}, status=401)
+    if request.method != 'POST':
+        return JsonResponse({'message': 'Method not allowed.'}, status=405)
+    if request.content_type != 'application/json':
+        return JsonResponse({'message': 'Content-Type must be application/json.'}, status=400)
+    try:
+        payload = json.loads(request.body.decode('utf-8'))
+    except Exception:
+        return JsonResponse({'message': 'Invalid JSON.'}, status=400)
+    taps = payload.get('taps') if isinstance(payload, dict) else payload
+    if not isinstance(taps, list):
+        return JsonResponse({'message': 'Expected a list of taps.'}, status=400)
+    limit = getattr(settings, 'RFID_TAP_BATCH_LIMIT', 10000)
+    if len(taps) > limit:
+        return JsonResponse({'message': f'At most {limit} taps per batch.'}, status=413)
+    return JsonResponse(ingest_taps(taps))
+
+def _parse_log_cursor(value):
+    """Split a ``<date>.<id>`` page cursor; None if missing or malformed."""
+    if not value:
+        return None
+    date_part, _, id_part = value.partition('.')
+    date = parse_date(date_part) if date_part else None
+    if date is None or not id_part.isdigit():
+        return None
+    return date, int(id_part)
+
+def _log_cursor(log):
+    return f"{log.date.isoformat()}.{log.pk}"
 
 def time_log_view(request):
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+    is_admin = request.roles.is_admin
     if not is_admin:
         return render(request, 'rfid_login/time_log.html', {'error': 'Access denied. Admin privileges required.', 'is_admin': is_admin})
 
     # Get filter parameters from GET request
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
     officer_id = request.GET.get('officer_id')
+    page_size = getattr(settings, 'TIME_LOG_PAGE_SIZE', 50)
 
-    # Start with base queryset
-    time_logs = TimeLog.objects.all().order_by('-date')
+    # Start with base queryset. The officer is joined in so rendering a row
+    # doesn't query again; hours come from the stored session duration.
+    time_logs = TimeLog.objects.select_related('officer')
 
     # Apply filters
     if start_date:
@@ -87,149 +157,106 @@ def time_log_view(request):
     if officer_id:
         time_logs = time_logs.filter(officer_id=officer_id)
 
-    # Get all officers for dropdown
-    officers = Officer.objects.all()
-
-    # Calculate total hours for each log and add to context
-    logs_with_hours = []
-    for log in time_logs:
-        if log.time_in and log.time_out:
-            duration = log.time_out - log.time_in
-            total_hours = round(duration.total_seconds() / 3600, 2)  # Convert to hours, round to 2 decimals
-        else:
-            total_hours = None
-        logs_with_hours.append({
-            'log': log,
-            'total_hours': total_hours
-        })
+    # Keyset pagination on (date, id), newest first. A page seeks straight
+    # to its cursor in the (date, id) index instead of skipping rows with
+    # OFFSET, so every page costs the same. ``after`` pages towards older
+    # logs, ``before`` back towards newer ones.
+    after = _parse_log_cursor(request.GET.get('after'))
+    before = None if after else _parse_log_cursor(request.GET.get('before'))
+    if after:
+        time_logs = time_logs.filter(date__lte=after[0]).exclude(date=after[0], id__gte=after[1])
+    elif before:
+        time_logs = time_logs.filter(date__gte=before[0]).exclude(date=before[0], id__lte=before[1])
+    if before:
+        page = list(time_logs.order_by('date', 'id')[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size][::-1]
+        has_newer, has_older = has_more, True
+    else:
+        page = list(time_logs.order_by('-date', '-id')[:page_size + 1])
+        has_older = len(page) > page_size
+        page = page[:page_size]
+        has_newer = after is not None
+
+    # Get officers for dropdown
+    officers = Officer.objects.order_by('name').values('id', 'name')
+
+    # Pagination links keep the current filters.
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    newer_url = older_url = None
+    if page and has_newer:
+        query['before'] = _log_cursor(page[0])
+        newer_url = f"?{query.urlencode()}"
+        query.pop('before')
+    if page and has_older:
+        query['after'] = _log_cursor(page[-1])
+        older_url = f"?{query.urlencode()}"
 
     return render(request, 'rfid_login/time_log.html', {
-        'time_logs': logs_with_hours,  # Now a list of dicts with log and hours
+        'time_logs': page,
         'officers': officers,
         'is_admin': is_admin,
+        'is_first_page': not has_newer,
+        'newer_url': newer_url,
+        'older_url': older_url,
         'filters': {'start_date': start_date, 'end_date': end_date, 'officer_id': officer_id}  # For form pre-filling
     })
 
+async def time_log_stream(request):
+    """Server-Sent Events feed of time-in/time-out events for the time log page.
+
+    Only served under ASGI. A WSGI worker can only run the endless async
+    stream by buffering it, so it would send nothing and stay blocked for
+    as long as the page is open; there the page goes without live updates.
+    """
+    is_admin = (await request.aroles()).is_admin
+    if not is_admin:
+        return HttpResponse('Access denied', status=403)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('Live updates require the ASGI server.', status=501)
+
+    async def event_stream():
+        yield 'retry: 5000\n\n'
+        async with get_event_backend().subscribe() as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream.
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def time_reports_view(request):
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+    is_admin = request.roles.is_admin
     if not is_admin:
         return render(request, 'rfid_login/time_reports.html', {'error': 'Access denied. Admin privileges required.', 'is_admin': is_admin})
 
-    is_executive_or_staff = request.user.groups.filter(name='executive officer').exists() or request.user.groups.filter(name='staff').exists()
+    is_executive_or_staff = request.roles.is_executive_or_staff
 
-    # Get filter parameters from GET request
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-
-    # Base queryset for logs_by_date
-    logs_by_date = TimeLog.objects.values('date').annotate(
-        total_officers=Count('officer', distinct=True)
-    )
-
-    # Apply filters
-    if start_date:
-        logs_by_date = logs_by_date.filter(date__gte=start_date)
-    if end_date:
-        logs_by_date = logs_by_date.filter(date__lte=end_date)
-
-    logs_by_date = logs_by_date.order_by('date')
-
-    # Calculate hours manually
-    for log in logs_by_date:
-        total_seconds = 0
-        time_logs = TimeLog.objects.filter(date=log['date'], time_out__isnull=False)
-        for tl in time_logs:
-            duration = tl.time_out - tl.time_in
-            total_seconds += duration.total_seconds()
-        log['total_hours'] = total_seconds / 3600  # Convert to hours
-
-    # Prepare data for first chart (overall by date)
-    dates = [log['date'].strftime('%b %d') for log in logs_by_date]
-    officers_count = [log['total_officers'] for log in logs_by_date]
-    total_hours_list = [round(log['total_hours'] or 0, 2) for log in logs_by_date]
-
-    # Second chart: Total hours per officer for filtered dates
-    filtered_logs = TimeLog.objects.filter(time_out__isnull=False)
-    if start_date:
-        filtered_logs = filtered_logs.filter(date__gte=start_date)
-    if end_date:
-        filtered_logs = filtered_logs.filter(date__lte=end_date)
-
-    officer_hours_dict = {}
-    for log in filtered_logs:
-        name = log.officer.name
-        duration = log.time_out - log.time_in
-        hours = duration.total_seconds() / 3600
-        officer_hours_dict[name] = officer_hours_dict.get(name, 0) + hours
-
-    # Sort by total hours descending
-    sorted_officers = sorted(officer_hours_dict.items(), key=lambda x: x[1], reverse=True)
-    officer_names = [name for name, hours in sorted_officers]
-    officer_total_hours = [round(hours, 2) for name, hours in sorted_officers]
-
-    # Calculate new metrics
-    # Most Active Officer and Top 3
-    if sorted_officers:
-        most_active_officer = sorted_officers[0][0]
-        top_3_officers = [name for name, hours in sorted_officers[:3]]
-    else:
-        most_active_officer = "N/A"
-        top_3_officers = []
-
-    # Highest Hours (Single Day)
-    highest_single_day_hours = 0
-    for log in filtered_logs:
-        if log.time_in and log.time_out:
-            duration = log.time_out - log.time_in
-            hours = duration.total_seconds() / 3600
-            if hours > highest_single_day_hours:
-                highest_single_day_hours = hours
-
-    # Average Hours per Officer
-    total_officers = len(sorted_officers)
-    total_hours_all = sum(hours for name, hours in sorted_officers)
-    average_hours_per_officer = total_hours_all / total_officers if total_officers > 0 else 0
-
-    # Most Active Date
-    date_hours = {}
-    for log in filtered_logs:
-        date_str = str(log.date)
-        duration = log.time_out - log.time_in if log.time_out else timedelta(0)
-        hours = duration.total_seconds() / 3600
-        date_hours[date_str] = date_hours.get(date_str, 0) + hours
-    most_active_date = max(date_hours, key=date_hours.get) if date_hours else "N/A"
-
-    # Total Days Covered
-    total_days_covered = len(date_hours)
-
-
-
-    # Debug
-    print("Dates:", dates)
-    print("Officers Count:", officers_count)
-    print("Total Hours List:", total_hours_list)
-    print("Officer Names:", officer_names)
-    print("Officer Total Hours:", officer_total_hours)
-
-    print("Most Active Officer:", most_active_officer)
-    print("Top 3 Officers:", top_3_officers)
-    print("Highest Single Day Hours:", round(highest_single_day_hours, 2))
-    print("Average Hours per Officer:", round(average_hours_per_officer, 2))
-    print("Total Officers:", total_officers)
-    print("Most Active Date:", most_active_date)
-    print("Total Days Covered:", total_days_covered)
+    data = get_time_reports_data(request)
+    analytics = get_time_analytics_data(request)
 
+    # Charts fetch their data from time_reports_data_api and
+    # time_analytics_api, which can answer 304 Not Modified.
     return render(request, 'rfid_login/time_reports.html', {
-        'logs_by_date': logs_by_date,
-        'officer_hours': sorted_officers,
-        'dates': json.dumps(dates),
-        'officers_count': json.dumps(officers_count),
-        'total_hours_list': json.dumps(total_hours_list),
-        'officer_names': json.dumps(officer_names),
-        'officer_total_hours': json.dumps(officer_total_hours),
+        'logs_by_date': data['logs_by_date'],
+        'officer_hours': data['officer_hours'],
         'is_admin': is_admin,
         'is_executive_or_staff': is_executive_or_staff,
-        'filters': {'start_date': start_date, 'end_date': end_date}
+        'analytics': analytics,
+        'granularity': data['granularity'],
+        'granularity_choices': granularity_choices.CHOICES,
+        'occupancy_buckets': occupancy.BUCKET_CHOICES,
+        'default_occupancy_bucket': occupancy.DEFAULT_BUCKET,
+        'filters': data['filters']
     })
 
 # Additional simple officer CRUD for UI
@@ -268,118 +295,161 @@ def officer_delete(request, pk):
 
 def get_time_reports_data(request):
     """Helper function to get time reports data, reused in main view and exports."""
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+    is_admin = request.roles.is_admin
     if not is_admin:
         return None  # Or raise permission denied
 
-    # Get filter parameters from GET request
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    granularity = granularity_choices.normalize(request.GET.get('granularity'))
+    return report_cache.get_or_compute(
+        'time', start_date, end_date,
+        lambda: build_time_report(start_date, end_date, granularity),
+        variant=_granularity_variant(request),
+    )
 
-    # Base queryset for logs_by_date
-    logs_by_date = TimeLog.objects.values('date').annotate(
-        total_officers=Count('officer', distinct=True)
+def _granularity_variant(request):
+    """Cache variant for the requested granularity; '' for the default (auto)."""
+    granularity = granularity_choices.normalize(request.GET.get('granularity'))
+    return '' if granularity == granularity_choices.AUTO else granularity
+
+def _stored_report(format, start_date, end_date):
+    """FileResponse for an up-to-date rendered artifact, or None."""
+    version = report_jobs.data_version(start_date, end_date)
+    jobs = ReportJob.objects.filter(
+        format=format, start_date=start_date, end_date=end_date,
+        data_version=version, status=ReportJob.STATUS_DONE,
+    ).order_by('-created_at')
+    for job in jobs:
+        path = report_jobs.artifact_path(job)
+        if path.exists():
+            return FileResponse(
+                open(path, 'rb'), as_attachment=True,
+                filename=report_jobs.download_name(job),
+                content_type=report_jobs.CONTENT_TYPES[job.format],
+            )
+    return None
+
+def _time_report_etag(request, variant=''):
+    """ETag for a time report JSON response, or None to skip conditional GET."""
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return None
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    return report_cache.etag('time', start_date, end_date, variant)
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=lambda request: _time_report_etag(request, _granularity_variant(request)))
+def time_reports_data_api(request):
+    """Chart and summary data of the time reports page as JSON."""
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    return JsonResponse(get_time_reports_data(request))
+
+def get_time_analytics_data(request):
+    """Attendance analytics for the filtered range, cached like the report."""
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    return report_cache.get_or_compute(
+        'time', start_date, end_date,
+        lambda: build_attendance_analytics(start_date, end_date),
+        variant='analytics',
     )
 
-    # Apply filters
-    if start_date:
-        logs_by_date = logs_by_date.filter(date__gte=start_date)
-    if end_date:
-        logs_by_date = logs_by_date.filter(date__lte=end_date)
-
-    logs_by_date = logs_by_date.order_by('date')
-
-    # Calculate hours manually
-    for log in logs_by_date:
-        total_seconds = 0
-        time_logs = TimeLog.objects.filter(date=log['date'], time_out__isnull=False)
-        for tl in time_logs:
-            duration = tl.time_out - tl.time_in
-            total_seconds += duration.total_seconds()
-        log['total_hours'] = total_seconds / 3600  # Convert to hours
-
-    # Prepare data for first chart (overall by date)
-    dates = [log['date'].strftime('%b %d') for log in logs_by_date]
-    officers_count = [log['total_officers'] for log in logs_by_date]
-    total_hours_list = [round(log['total_hours'] or 0, 2) for log in logs_by_date]
-
-    # Second chart: Total hours per officer for filtered dates
-    filtered_logs = TimeLog.objects.filter(time_out__isnull=False)
-    if start_date:
-        filtered_logs = filtered_logs.filter(date__gte=start_date)
-    if end_date:
-        filtered_logs = filtered_logs.filter(date__lte=end_date)
-
-    officer_hours_dict = {}
-    for log in filtered_logs:
-        name = log.officer.name
-        duration = log.time_out - log.time_in
-        hours = duration.total_seconds() / 3600
-        officer_hours_dict[name] = officer_hours_dict.get(name, 0) + hours
-
-    # Sort by total hours descending
-    sorted_officers = sorted(officer_hours_dict.items(), key=lambda x: x[1], reverse=True)
-    officer_names = [name for name, hours in sorted_officers]
-    officer_total_hours = [round(hours, 2) for name, hours in sorted_officers]
-
-    # Calculate new metrics
-    # Most Active Officer and Top 3
-    if sorted_officers:
-        most_active_officer = sorted_officers[0][0]
-        top_3_officers = [name for name, hours in sorted_officers[:3]]
-    else:
-        most_active_officer = "N/A"
-        top_3_officers = []
-
-    # Highest Hours (Single Day)
-    highest_single_day_hours = 0
-    for log in filtered_logs:
-        if log.time_in and log.time_out:
-            duration = log.time_out - log.time_in
-            hours = duration.total_seconds() / 3600
-            if hours > highest_single_day_hours:
-                highest_single_day_hours = hours
-
-    # Average Hours per Officer
-    total_officers = len(sorted_officers)
-    total_hours_all = sum(hours for name, hours in sorted_officers)
-    average_hours_per_officer = total_hours_all / total_officers if total_officers > 0 else 0
-
-    # Most Active Date
-    date_hours = {}
-    for log in filtered_logs:
-        date_str = str(log.date)
-        duration = log.time_out - log.time_in if log.time_out else timedelta(0)
-        hours = duration.total_seconds() / 3600
-        date_hours[date_str] = date_hours.get(date_str, 0) + hours
-    most_active_date = max(date_hours, key=date_hours.get) if date_hours else "N/A"
-
-    # Total Days Covered
-    total_days_covered = len(date_hours)
-
-    return {
-        'logs_by_date': logs_by_date,
-        'officer_hours': sorted_officers,
-        'dates': dates,
-        'officers_count': officers_count,
-        'total_hours_list': total_hours_list,
-        'officer_names': officer_names,
-        'officer_total_hours': officer_total_hours,
-        'most_active_officer': most_active_officer,
-        'top_3_officers': top_3_officers,
-        'highest_single_day_hours': round(highest_single_day_hours, 2),
-        'average_hours_per_officer': round(average_hours_per_officer, 2),
-        'total_officers': total_officers,
-        'most_active_date': most_active_date,
-        'total_days_covered': total_days_covered,
-        'filters': {'start_date': start_date, 'end_date': end_date}
-    }
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=lambda request: _time_report_etag(request, 'analytics'))
+def time_analytics_api(request):
+    """JSON version of the attendance analytics on the time reports page."""
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    return JsonResponse(get_time_analytics_data(request))
+
+def _occupancy_params(request):
+    """Parse the occupancy query; raises ValueError with a client message."""
+    start_date = parse_date(report_cache.normalize_date(request.GET.get('start_date')) or '')
+    end_date = parse_date(report_cache.normalize_date(request.GET.get('end_date')) or '')
+    try:
+        bucket = int(request.GET.get('bucket', occupancy.DEFAULT_BUCKET))
+    except ValueError:
+        bucket = occupancy.DEFAULT_BUCKET
+    if bucket not in occupancy.BUCKET_CHOICES:
+        raise ValueError(f'bucket must be one of {list(occupancy.BUCKET_CHOICES)}')
+    min_staff = request.GET.get('min_staff')
+    if min_staff is not None:
+        if not min_staff.isdigit():
+            raise ValueError('min_staff must be a non-negative integer')
+        min_staff = int(min_staff)
+    occupancy.resolve_range(start_date, end_date)
+    return start_date, end_date, bucket, min_staff
+
+def _occupancy_cache_range(start_date, end_date):
+    """Date range the occupancy result is versioned on, or None if uncacheable.
+
+    Open sessions grow until they are closed, so ranges reaching today
+    aren't cached. Sessions are read from a day either side of the range,
+    so writes there must invalidate it too.
+    """
+    if end_date is None or end_date >= timezone.localdate():
+        return None
+    return (
+        (start_date - timedelta(days=1)).isoformat() if start_date else None,
+        (end_date + timedelta(days=1)).isoformat(),
+    )
+
+def _occupancy_etag(request):
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return None
+    try:
+        start_date, end_date, bucket, min_staff = _occupancy_params(request)
+    except ValueError:
+        return None
+    cache_range = _occupancy_cache_range(start_date, end_date)
+    if cache_range is None:
+        return None
+    return report_cache.etag('time', *cache_range, variant=f'occupancy:{bucket}:{min_staff}')
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_occupancy_etag)
+def time_occupancy_api(request):
+    """Officers on site per time bucket for the filtered range, as JSON.
+
+    ``bucket`` is the bucket size in minutes; with ``min_staff`` the periods
+    below that head count are listed as well.
+    """
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+
+    try:
+        start_date, end_date, bucket, min_staff = _occupancy_params(request)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    def compute():
+        return occupancy.build_occupancy(start_date, end_date, bucket, min_staff)
+
+    cache_range = _occupancy_cache_range(start_date, end_date)
+    if cache_range is None:
+        return JsonResponse(compute())
+    return JsonResponse(report_cache.get_or_compute(
+        'time', *cache_range, compute, variant=f'occupancy:{bucket}:{min_staff}',
+    ))
 
 def export_csv(request):
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+    is_admin = request.roles.is_admin
     if not is_admin:
         return HttpResponse('Access denied', status=403)
 
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    stored = _stored_report(ReportJob.FORMAT_CSV, start_date, end_date)
+    if stored:
+        return stored
+
     data = get_time_reports_data(request)
     if not data:
         return HttpResponse('No data available', status=404)
@@ -387,102 +457,156 @@ def export_csv(request):
     # Create CSV response
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="officer_hours_summary.csv"'
+    write_summary_csv(data, response)
+    metrics.export_bytes.observe(len(response.content), format='csv')
 
-    writer = csv.writer(response)
-    writer.writerow(['Officer Name', 'Total Hours'])
+    return response
+
+class Echo:
+    """File-like object that hands each written CSV line straight back."""
+    def write(self, value):
+        return value
+
+def _time_log_csv_row(officer_id, officer_name, date, time_in, time_out, duration_seconds):
+    return [
+        officer_id,
+        officer_name,
+        date.isoformat(),
+        timezone.localtime(time_in).strftime('%Y-%m-%d %H:%M:%S') if time_in else '',
+        timezone.localtime(time_out).strftime('%Y-%m-%d %H:%M:%S') if time_out else '',
+        round(duration_seconds / 3600, 2) if duration_seconds is not None else '',
+    ]
 
-    for name, hours in data['officer_hours']:
-        writer.writerow([name, round(hours, 2)])
+def export_logs_csv(request):
+    """Stream every TimeLog row in the filtered range as CSV.
 
+    Rows come from a chunked server-side cursor with the officer joined in,
+    so memory stays flat and the header is sent before the query finishes.
+    """
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return HttpResponse('Access denied', status=403)
+
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    officer_id = request.GET.get('officer_id')
+
+    time_logs = TimeLog.objects.order_by('date', 'time_in', 'id')
+    if start_date:
+        time_logs = time_logs.filter(date__gte=start_date)
+    if end_date:
+        time_logs = time_logs.filter(date__lte=end_date)
+    if officer_id:
+        time_logs = time_logs.filter(officer_id=officer_id)
+    time_logs = time_logs.values_list('officer_id', 'officer__name', 'date', 'time_in', 'time_out', 'duration_seconds')
+
+    writer = csv.writer(Echo())
+    header = ['Officer ID', 'Officer Name', 'Date', 'Time In', 'Time Out', 'Total Hours']
+    chunk_size = getattr(settings, 'EXPORT_STREAM_CHUNK_SIZE', 2000)
+
+    # Feed the response an iterator of the server's own flavour; Django
+    # buffers the whole body when it has to adapt sync <-> async iterators.
+    if isinstance(request, ASGIRequest):
+        # values_list() querysets can't open their cursor from the event
+        # loop, so each chunk is fetched on the database thread instead.
+        async def rows():
+            line = writer.writerow(header)
+            size = len(line.encode())
+            yield line
+            cursor = time_logs.iterator(chunk_size=chunk_size)
+            fetch = sync_to_async(lambda: list(islice(cursor, chunk_size)))
+            while chunk := await fetch():
+                for row in chunk:
+                    line = writer.writerow(_time_log_csv_row(*row))
+                    size += len(line.encode())
+                    yield line
+            metrics.export_bytes.observe(size, format='logs_csv')
+    else:
+        def rows():
+            line = writer.writerow(header)
+            size = len(line.encode())
+            yield line
+            for row in time_logs.iterator(chunk_size=chunk_size):
+                line = writer.writerow(_time_log_csv_row(*row))
+                size += len(line.encode())
+                yield line
+            metrics.export_bytes.observe(size, format='logs_csv')
+
+    filename = f"time_logs_{start_date or 'start'}_to_{end_date or 'end'}.csv"
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 def export_pdf(request):
-    is_admin = request.user.is_superuser or request.user.groups.filter(name__in=['Executive Officer', 'Staff']).exists()
+    is_admin = request.roles.is_admin
     if not is_admin:
         return HttpResponse('Access denied', status=403)
 
+    start_date = report_cache.normalize_date(request.GET.get('start_date'))
+    end_date = report_cache.normalize_date(request.GET.get('end_date'))
+    stored = _stored_report(ReportJob.FORMAT_PDF, start_date, end_date)
+    if stored:
+        return stored
+
     data = get_time_reports_data(request)
     if not data:
         return HttpResponse('No data available', status=404)
 
-    # Create PDF buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-        textColor=colors.Color(0, 123/255, 255/255),  # Blue color matching website
-    )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12,
-        textColor=colors.Color(102/255, 126/255, 234/255),  # Purple gradient start color
-    )
-
-    # Title
-    elements.append(Paragraph("Time Reports Summary", title_style))
-    elements.append(Spacer(1, 12))
-
-    # Filters info
-    filters = data['filters']
-    filter_text = f"Date Range: {filters['start_date'] or 'All'} to {filters['end_date'] or 'All'}"
-    elements.append(Paragraph(filter_text, styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Summary metrics
-    elements.append(Paragraph("Summary Metrics", heading_style))
-    metrics_data = [
-        ["Total Officers", str(data['total_officers'])],
-        ["Total Days Covered", str(data['total_days_covered'])],
-        ["Most Active Officer", data['most_active_officer']],
-        ["Most Active Date", data['most_active_date']],
-        ["Highest Single Day Hours", f"{data['highest_single_day_hours']} hours"],
-        ["Average Hours per Officer", f"{data['average_hours_per_officer']:.2f} hours"],
-    ]
-    metrics_table = Table(metrics_data, colWidths=[2*inch, 3*inch])
-    metrics_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(102/255, 126/255, 234/255)),  # Purple gradient start color
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.Color(0, 123/255, 255/255, 0.1)),  # Light blue background for rows
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(metrics_table)
-    elements.append(Spacer(1, 20))
-
-    # Officer Hours Table
-    elements.append(Paragraph("Officer Hours Summary", heading_style))
-    officer_data = [['Officer Name', 'Total Hours']] + [[name, f"{hours:.2f}"] for name, hours in data['officer_hours']]
-    officer_table = Table(officer_data, colWidths=[3*inch, 2*inch])
-    officer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(102/255, 126/255, 234/255)),  # Purple gradient start color
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.Color(0, 123/255, 255/255, 0.1)),  # Light blue background for rows
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(officer_table)
-
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-
     # Create response
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
+    pdf = render_pdf(data)
+    metrics.export_bytes.observe(len(pdf), format='pdf')
+    response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = 'attachment; filename="time_reports.pdf"'
 
     return response
+
+@require_POST
+def report_job_create(request):
+    """Queue a PDF or summary CSV render and return its status as JSON."""
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+
+    format = request.POST.get('format')
+    if format not in dict(ReportJob.FORMAT_CHOICES):
+        return JsonResponse({'error': 'Unknown report format'}, status=400)
+    start_date = report_cache.normalize_date(request.POST.get('start_date'))
+    end_date = report_cache.normalize_date(request.POST.get('end_date'))
+    job = report_jobs.request_report(format, start_date, end_date, requested_by=request.user.get_username())
+    return JsonResponse(_report_job_payload(job), status=200 if job.status == ReportJob.STATUS_DONE else 202)
+
+def report_job_status(request, pk):
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+
+    job = get_object_or_404(ReportJob, pk=pk)
+    return JsonResponse(_report_job_payload(job))
+
+def report_job_download(request, pk):
+    is_admin = request.roles.is_admin
+    if not is_admin:
+        return HttpResponse('Access denied', status=403)
+
+    job = get_object_or_404(ReportJob, pk=pk, status=ReportJob.STATUS_DONE)
+    path = report_jobs.artifact_path(job)
+    if not path.exists():
+        return HttpResponse('Report file is no longer available', status=410)
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True,
+        filename=report_jobs.download_name(job),
+        content_type=report_jobs.CONTENT_TYPES[job.format],
+    )
+
+def _report_job_payload(job):
+    payload = {
+        'id': job.pk,
+        'format': job.format,
+        'status': job.status,
+        'status_url': reverse('rfid_login:report_job_status', args=[job.pk]),
+        'download_url': None,
+        'error': job.error or None,
+    }
+    if job.status == ReportJob.STATUS_DONE:
+        payload['download_url'] = reverse('rfid_login:report_job_download', args=[job.pk])
+    return payload